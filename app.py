@@ -1,15 +1,20 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
-import base64
 from io import BytesIO
 import time
 import os
 import numpy as np
 import database as db
-from nsetools import Nse
+import market_data
+import cache_warmer
+import symbol_search
+import indicators
+import charting
+import exports
+import tables
 import streamlit.components.v1 as components
 
 # Set page configuration
@@ -56,6 +61,25 @@ def create_splash_screen():
 if 'splash_shown' not in st.session_state:
     st.session_state.splash_shown = False
     
+# Create missing tables and columns and warm the stock id cache once per server process
+@st.cache_resource
+def prepare_database():
+    try:
+        db.create_tables()
+        db.migrate_schema()
+        db.warm_stock_id_cache()
+    except Exception as e:
+        print(f"Error preparing database: {e}")
+
+prepare_database()
+
+# Keep quotes and history for watched and held symbols warm in the background
+@st.cache_resource
+def start_background_workers():
+    return cache_warmer.start_cache_warmer()
+
+start_background_workers()
+
 # Get demo user
 if 'user_id' not in st.session_state:
     try:
@@ -101,6 +125,10 @@ if 'symbol' not in st.session_state:
     st.session_state.symbol = "TATASTEEL.NS"
 if 'days' not in st.session_state:
     st.session_state.days = 365
+if 'selected_indicators' not in st.session_state:
+    st.session_state.selected_indicators = []
+if 'timeframe' not in st.session_state:
+    st.session_state.timeframe = "Daily"
 if 'watchlist_id' not in st.session_state:
     # Get user's default watchlist
     try:
@@ -109,12 +137,7 @@ if 'watchlist_id' not in st.session_state:
             st.session_state.watchlist_id = watchlists[0].id
         else:
             # Create a default watchlist if none exists
-            watchlist = db.Watchlist(name="My Watchlist", user_id=st.session_state.user_id)
-            db_session = db.SessionLocal()
-            db_session.add(watchlist)
-            db_session.commit()
-            db_session.refresh(watchlist)
-            db_session.close()
+            watchlist = db.create_watchlist(st.session_state.user_id)
             st.session_state.watchlist_id = watchlist.id
     except Exception as e:
         # Default ID if database connection fails
@@ -165,11 +188,17 @@ with st.sidebar:
         selected_period = st.selectbox("Select Time Period", list(period_options.keys()))
         st.session_state.days = period_options[selected_period]
         
+        # Bar size for the chart and metrics table
+        st.selectbox("Timeframe", list(market_data.TIMEFRAMES.keys()) + list(market_data.INTRADAY_TIMEFRAMES.keys()), key="timeframe")
+        
         # Moving averages selection
         st.session_state.show_ma = st.checkbox("Show Moving Averages", value=st.session_state.show_ma)
         if st.session_state.show_ma:
             ma_options = [5, 20, 50, 100, 200]
             st.session_state.selected_ma = st.multiselect("Select Moving Average Periods", ma_options, default=st.session_state.selected_ma)
+        
+        # Technical indicators, computed natively from the price history
+        st.session_state.selected_indicators = st.multiselect("Technical Indicators", list(indicators.INDICATORS.keys()), default=st.session_state.selected_indicators)
     
     # Trading Platform settings
     elif st.session_state.selected_app == "Trading Platform":
@@ -210,6 +239,10 @@ with st.sidebar:
     # Refresh data button
     if st.button("Refresh Data"):
         st.rerun()
+    
+    # Connection pool usage; connects growing with checkouts means connections churn
+    with st.expander("Database Connections"):
+        st.json(db.get_pool_status())
         
     # Add app info at the bottom of sidebar
     st.markdown("---")
@@ -217,164 +250,260 @@ with st.sidebar:
     st.markdown("Financial Ecosystem")
     st.markdown("© 2025 All rights reserved")
 
-# Function to get stock data
+# Function to resolve the exchange suffix for a ticker
 @st.cache_data(ttl=3600)  # Cache data for an hour
-def get_stock_data(ticker, days):
-    end_date = datetime.today()
-    start_date = end_date - timedelta(days=days)
+def resolve_ticker(ticker):
+    # Look the ticker up in the symbol master first
+    try:
+        query_ticker = market_data.resolve_symbol(ticker)
+        if query_ticker:
+            return query_ticker
+    except Exception as e:
+        print(f"Symbol master lookup failed for {ticker}: {e}")
     
+    # Unknown symbol, check if it's an Indian stock by trying NSE then BSE
     try:
-        # Handle Indian stock symbols
-        if ticker.endswith('.NS') or ticker.endswith('.BO'):
-            # Symbol already has exchange suffix
-            query_ticker = ticker
-        else:
-            # Check if it's an Indian stock by trying with NSE suffix first
-            try:
-                test_data = yf.download(f"{ticker}.NS", period='1d')
-                if not test_data.empty:
-                    query_ticker = f"{ticker}.NS"
-                    st.info(f"Using NSE exchange for {ticker}")
-                else:
-                    # Try BSE suffix
-                    test_data = yf.download(f"{ticker}.BO", period='1d')
-                    if not test_data.empty:
-                        query_ticker = f"{ticker}.BO"
-                        st.info(f"Using BSE exchange for {ticker}")
-                    else:
-                        # Use as-is (probably US stock)
-                        query_ticker = ticker
-            except Exception as e:
-                # If error in checking, use as provided
-                query_ticker = ticker
-                st.warning(f"Could not verify exchange for {ticker}. Using as provided.")
+        suffix = market_data.probe_exchange(ticker)
+        if suffix == ".NS":
+            st.info(f"Using NSE exchange for {ticker}")
+            return f"{ticker}.NS"
+        if suffix == ".BO":
+            st.info(f"Using BSE exchange for {ticker}")
+            return f"{ticker}.BO"
+        
+        # Use as-is (probably US stock)
+        return ticker
+    except Exception as e:
+        # If error in checking, use as provided
+        st.warning(f"Could not verify exchange for {ticker}. Using as provided.")
+        return ticker
+
+# Function to get company info (other fundamentals are loaded on demand,
+# or all at once in parallel when the full profile is requested)
+def get_company_info(query_ticker, full_profile=False):
+    if full_profile:
+        info = market_data.get_full_profile(query_ticker)
+    else:
+        info = dict(market_data.get_fundamentals(query_ticker, "info") or {})
+    info['symbol'] = info.get('symbol', query_ticker)
+    return info
+
+# Function to get price data without waiting on any fundamentals
+def get_price_data(ticker, days, timeframe="Daily"):
+    try:
+        query_ticker = resolve_ticker(ticker)
         
-        # Get historical data
-        st.info(f"Fetching data for {query_ticker}...")
-        data = yf.download(query_ticker, start=start_date, end=end_date)
+        # Price history is cached per symbol (widest window requested so far),
+        # so every period is a slice of the same frame; weekly and coarser bars
+        # are resampled from it once and updated as new days arrive
+        data = market_data.get_timeframe_history(query_ticker, days, timeframe)
         
         # Check if data was found
         if data.empty:
             st.error(f"No data found for {query_ticker}. Please check the symbol.")
-            return None, None
-            
-        # Get company info
-        ticker_info = yf.Ticker(query_ticker)
-        info = ticker_info.info
+            return None, query_ticker
         
-        # Also get recommendations, institutional holders, and balance sheet
-        try:
-            recommendations = ticker_info.recommendations
-            holders = ticker_info.institutional_holders
-            balance_sheet = ticker_info.balance_sheet
-            
-            # Include these in the info dictionary
-            info['recommendations'] = recommendations
-            info['institutional_holders'] = holders
-            info['balance_sheet'] = balance_sheet
-            
-            # Get more financial data
-            financials = ticker_info.financials
-            cashflow = ticker_info.cashflow
-            earnings = ticker_info.earnings
-            
-            info['financials'] = financials
-            info['cashflow'] = cashflow
-            info['earnings'] = earnings
-            
-            # Get news
-            try:
-                news = ticker_info.news
-                info['news'] = news
-            except:
-                pass
-                
-        except Exception as e:
-            # Not all stocks have this data, so just continue
-            pass
-        
-        return data, info
+        return data, query_ticker
     except Exception as e:
         st.error(f"Error fetching data: {e}")
         return None, None
 
-# Function to create stock price chart
-def create_stock_chart(data, ticker, selected_ma=None):
-    fig = go.Figure()
+# Function to create the price chart with volume and indicator panels on one shared
+# date axis. Figures are cached, so reruns that only change other widgets reuse them.
+def create_stock_chart(data, ticker, days, selected_ma=None, selected_indicators=None, timeframe="Daily"):
+    selected_ma = tuple(selected_ma or ())
+    selected_indicators = tuple(selected_indicators or ())
+    theme = st.session_state.theme if 'theme' in st.session_state else "light"
+    
+    key = ("stock_chart", ticker, days, timeframe, selected_ma, selected_indicators, theme) + indicators.data_key(data)
+    return charting.figure_cache.get_or_compute(
+        key,
+        lambda: build_stock_chart(data, ticker, selected_ma, selected_indicators, theme, timeframe)
+    )
+
+# Length unit of one bar in each timeframe, for moving average labels
+BAR_UNITS = {"Daily": "day", "Weekly": "week", "Monthly": "month", "Quarterly": "quarter", "1 Minute": "minute", "5 Minutes": "bar", "15 Minutes": "bar"}
+
+def build_stock_chart(data, ticker, selected_ma, selected_indicators, theme, timeframe="Daily"):
+    overlays = [name for name in selected_indicators if name in indicators.OVERLAY_INDICATORS]
+    panels = [name for name in selected_indicators if name not in indicators.OVERLAY_INDICATORS]
+    
+    # WebGL lines cannot skip the hours a market is closed, so intraday charts
+    # (a few thousand bars at most) draw their lines as SVG
+    intraday = timeframe in market_data.INTRADAY_TIMEFRAMES
+    line_trace = go.Scatter if intraday else go.Scattergl
+    
+    # Price, volume, then one row per indicator panel
+    row_heights = [450, 150] + [180] * len(panels)
+    fig = make_subplots(
+        rows=len(row_heights), cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.03,
+        row_heights=row_heights,
+        subplot_titles=[f'{ticker} Stock Price', 'Volume'] + panels
+    )
     
-    # Add candlestick chart
+    # Long histories are re-aggregated into as many candles as the chart can show
+    candles = charting.downsample_ohlc(data)
+    
+    # Add candlestick chart (Plotly has no WebGL candlestick)
     fig.add_trace(go.Candlestick(
-        x=data.index,
-        open=data['Open'],
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
+        x=candles.index,
+        open=candles['Open'],
+        high=candles['High'],
+        low=candles['Low'],
+        close=candles['Close'],
         name=ticker,
         increasing_line_color='green',
         decreasing_line_color='red'
-    ))
+    ), row=1, col=1)
     
     # Add moving averages if selected
-    if selected_ma and len(selected_ma) > 0:
+    if selected_ma:
+        moving_averages = indicators.get_moving_averages(ticker, data, selected_ma)
         for ma in selected_ma:
-            ma_col = f'MA_{ma}'
-            data[ma_col] = data['Close'].rolling(window=ma).mean()
-            fig.add_trace(go.Scatter(
-                x=data.index, 
-                y=data[ma_col],
-                name=f'{ma}-day MA',
+            ma_values = charting.downsample_series(moving_averages[f'MA_{ma}'])
+            fig.add_trace(line_trace(
+                x=ma_values.index, 
+                y=ma_values,
+                name=f'{ma}-{BAR_UNITS[timeframe]} MA',
                 line=dict(width=1.5)
-            ))
-    
-    # Configure chart layout
-    fig.update_layout(
-        title=f'{ticker} Stock Price',
-        xaxis_title='Date',
-        yaxis_title='Price (USD)',
-        xaxis_rangeslider_visible=False,
-        height=500,
-        margin=dict(l=50, r=50, t=50, b=50),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-    )
-    
-    return fig
-
-# Function to create volume chart
-def create_volume_chart(data, ticker):
-    fig = go.Figure()
-    
-    # Add volume bars
+            ), row=1, col=1)
+    
+    # Add price overlays (Bollinger Bands, Ichimoku) if selected
+    if overlays:
+        indicator_values = indicators.get_indicators(ticker, data, overlays)
+        for column in indicator_values.columns:
+            values = charting.downsample_series(indicator_values[column])
+            fig.add_trace(line_trace(
+                x=values.index,
+                y=values,
+                name=column.replace('_', ' '),
+                line=dict(width=1, dash='dot')
+            ), row=1, col=1)
+    
+    # Add volume bars, summed over the same buckets as the candles
     fig.add_trace(go.Bar(
-        x=data.index,
-        y=data['Volume'],
+        x=candles.index,
+        y=candles['Volume'],
         name='Volume',
         marker=dict(color='rgba(0, 0, 255, 0.5)')
-    ))
+    ), row=2, col=1)
+    
+    # Reference levels drawn on bounded oscillators
+    levels = {"RSI": (30, 70), "Stochastic": (20, 80)}
+    
+    # Add indicator panels (RSI, MACD, ...) if selected
+    for row, name in enumerate(panels, start=3):
+        indicator_values = indicators.get_indicators(ticker, data, [name])
+        for column in indicator_values.columns:
+            values = charting.downsample_series(indicator_values[column])
+            if column == 'MACD_Hist':
+                fig.add_trace(go.Bar(x=values.index, y=values, name='MACD Histogram', marker=dict(color='rgba(0, 0, 255, 0.4)')), row=row, col=1)
+            else:
+                fig.add_trace(line_trace(x=values.index, y=values, name=column.replace('_', ' '), line=dict(width=1.5)), row=row, col=1)
+        for level in levels.get(name, ()):
+            fig.add_hline(y=level, line_dash='dash', line_color='gray', line_width=1, row=row, col=1)
     
     # Configure chart layout
     fig.update_layout(
-        title=f'{ticker} Trading Volume',
-        xaxis_title='Date',
-        yaxis_title='Volume',
-        height=300,
+        template='plotly_dark' if theme == 'dark' else 'plotly_white',
+        xaxis_rangeslider_visible=False,
+        height=sum(row_heights) + 100,
         margin=dict(l=50, r=50, t=50, b=50),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
     )
+    fig.update_yaxes(title_text='Price (USD)', row=1, col=1)
+    fig.update_yaxes(title_text='Volume', row=2, col=1)
+    fig.update_xaxes(title_text='Date', row=len(row_heights), col=1)
+    
+    if intraday and len(data) > 0:
+        # Hide nights and weekends, reading the session hours off the bars themselves
+        bar_hours = int(market_data.INTRADAY_TIMEFRAMES[timeframe].rstrip('m')) / 60
+        bar_times = data.index.hour + data.index.minute / 60
+        session_end = float(bar_times.max()) + bar_hours
+        rangebreaks = []
+        if not (data.index.dayofweek >= 5).any():
+            rangebreaks.append(dict(bounds=["sat", "mon"]))
+        if session_end < 24 and bar_times.min() > 0:
+            rangebreaks.append(dict(bounds=[session_end, float(bar_times.min())], pattern="hour"))
+        fig.update_xaxes(rangebreaks=rangebreaks)
     
     return fig
 
-# Function to create download link for CSV
-def get_csv_download_link(data, filename):
-    csv = data.to_csv(index=True)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">Download CSV file</a>'
-    return href
+# Function to show a large table one page at a time; sorting and filtering
+# happen here, so only the visible page is sent to the browser
+def show_paged_table(data, key):
+    table = tables.to_float32(data, exclude=["Volume"])
+    numeric_columns = list(table.select_dtypes(include="number").columns)
+    index_label = table.index.name or "Date"
+    
+    sort_col, order_col, filter_col, min_col, max_col = st.columns([2, 1, 2, 1, 1])
+    with sort_col:
+        sort_by = st.selectbox("Sort By", [index_label] + numeric_columns, key=f"{key}_sort")
+    with order_col:
+        st.write("")
+        descending = st.checkbox("Descending", value=True, key=f"{key}_descending")
+    with filter_col:
+        filter_column = st.selectbox("Filter Column", ["None"] + numeric_columns, key=f"{key}_filter")
+    with min_col:
+        min_value = st.number_input("Min", value=None, key=f"{key}_min", disabled=filter_column == "None")
+    with max_col:
+        max_value = st.number_input("Max", value=None, key=f"{key}_max", disabled=filter_column == "None")
+    
+    filtered = tables.filter_table(table, filter_column, min_value, max_value)
+    
+    size_col, page_col = st.columns([1, 1])
+    with size_col:
+        page_size = st.selectbox("Rows per Page", tables.TABLE_PAGE_SIZES, key=f"{key}_page_size")
+    with page_col:
+        last_page = tables.page_count(len(filtered), page_size)
+        page = min(st.number_input("Page", min_value=1, max_value=last_page, value=1, step=1, key=f"{key}_page"), last_page)
+    
+    page_rows = tables.table_page(filtered, sort_by, not descending, page, page_size)
+    column_config = {column: st.column_config.NumberColumn(format="%.2f") for column in page_rows.select_dtypes(include="float32").columns}
+    st.dataframe(page_rows, use_container_width=True, column_config=column_config)
+    
+    first_row = (page - 1) * page_size + 1 if len(page_rows) else 0
+    st.caption(f"Showing rows {first_row}-{first_row + len(page_rows) - 1 if len(page_rows) else 0} of {len(filtered)}")
+
+# Function to show export controls; the file is only built when the user asks for it
+def show_export_controls(data, base_name, key, index=True):
+    format_col, button_col = st.columns([3, 1])
+    with format_col:
+        export_format = st.selectbox("Export Format", list(exports.EXPORT_FORMATS.keys()), key=f"{key}_format")
+    with button_col:
+        st.write("")
+        prepare = st.button("Prepare Download", key=f"{key}_prepare")
+    
+    if prepare:
+        content, file_name, mime = exports.export_frame(data, base_name, export_format, index)
+        st.download_button(f"Download {file_name}", content, file_name=file_name, mime=mime, key=f"{key}_download", on_click="ignore")
 
 # Function to display company info
-def display_company_info(info):
+def display_company_info(info, query_ticker=None):
     if not info:
         st.warning("Company information not available")
         return
     
+    query_ticker = query_ticker or info.get('symbol')
+    
+    # Datasets beyond the basic profile are only fetched when their toggle is on,
+    # unless they already came in with the full profile
+    def dataset_requested(dataset, label):
+        if dataset in info:
+            return True
+        return st.toggle(label, key=f"load_{dataset}_{query_ticker}")
+    
+    def load_dataset(dataset):
+        if dataset in info:
+            return info[dataset]
+        try:
+            return market_data.get_fundamentals(query_ticker, dataset)
+        except Exception as e:
+            st.write(f"Error loading {dataset.replace('_', ' ')}: {e}")
+            return None
+    
     # Create two columns for company info
     col1, col2 = st.columns(2)
     
@@ -405,9 +534,9 @@ def display_company_info(info):
             st.write(info.get('longBusinessSummary'))
     
     # Display news if available
-    if info.get('news'):
-        with st.expander("Recent News"):
-            news_items = info.get('news')
+    with st.expander("Recent News"):
+        news_items = load_dataset('news') if dataset_requested('news', "Load recent news") else None
+        if news_items:
             for i, news in enumerate(news_items[:5]):  # Show top 5 news
                 st.markdown(f"### {news.get('title', 'News Title')}")
                 st.write(f"**Source:** {news.get('publisher', 'Unknown')}")
@@ -428,30 +557,33 @@ def display_company_info(info):
                     st.markdown("---")
     
     # Display financial data if available
-    if info.get('financials') is not None:
-        with st.expander("Financial Data"):
+    with st.expander("Financial Data"):
+        if dataset_requested('financials', "Load financial data"):
             try:
-                financials = info.get('financials')
-                st.write("### Income Statement (Last 4 Quarters)")
-                st.dataframe(financials)
+                financials = load_dataset('financials')
+                if financials is not None:
+                    st.write("### Income Statement (Last 4 Quarters)")
+                    st.dataframe(financials)
             except Exception as e:
                 st.write(f"Error displaying financials: {e}")
                 
     # Display institutional holders if available
-    if info.get('institutional_holders') is not None:
-        with st.expander("Institutional Holders"):
+    with st.expander("Institutional Holders"):
+        if dataset_requested('institutional_holders', "Load institutional holders"):
             try:
-                holders = info.get('institutional_holders')
-                st.dataframe(holders)
+                holders = load_dataset('institutional_holders')
+                if holders is not None:
+                    st.dataframe(holders)
             except Exception as e:
                 st.write(f"Error displaying institutional holders: {e}")
 
     # Display recommendations if available
-    if info.get('recommendations') is not None:
-        with st.expander("Analyst Recommendations"):
+    with st.expander("Analyst Recommendations"):
+        if dataset_requested('recommendations', "Load analyst recommendations"):
             try:
-                recommendations = info.get('recommendations')
-                st.dataframe(recommendations)
+                recommendations = load_dataset('recommendations')
+                if recommendations is not None:
+                    st.dataframe(recommendations)
             except Exception as e:
                 st.write(f"Error displaying recommendations: {e}")
 
@@ -460,7 +592,9 @@ def show_stock_analysis():
     # Use session state values
     symbol = st.session_state.symbol if 'symbol' in st.session_state else "TATASTEEL"
     days = st.session_state.days if 'days' in st.session_state else 365
+    timeframe = st.session_state.timeframe if 'timeframe' in st.session_state else "Daily"
     show_ma = st.session_state.show_ma if 'show_ma' in st.session_state else True
+    selected_indicators = st.session_state.selected_indicators if 'selected_indicators' in st.session_state else []
     selected_ma = st.session_state.selected_ma if 'selected_ma' in st.session_state else [20, 50]
     
     # Add Indian NSE stock lookup by sector
@@ -486,13 +620,26 @@ def show_stock_analysis():
         st.session_state.symbol = selected_indian_stock
         st.rerun()
     
-    # Get stock data
-    data, info = get_stock_data(symbol, days)
+    # Or search every listed stock by symbol or company name
+    search_text = st.sidebar.text_input("Search by symbol or company", key="stock_search")
+    if search_text:
+        matches = symbol_search.search_symbols(search_text)
+        if matches:
+            match_labels = {f"{match['symbol']} - {match['company_name']}": match['ticker'] for match in matches}
+            selected_match = st.sidebar.selectbox("Matching Stocks", list(match_labels.keys()))
+            if st.sidebar.button("Load Matching Stock"):
+                st.session_state.symbol = match_labels[selected_match]
+                st.rerun()
+        else:
+            st.sidebar.caption(f"No stocks found matching '{search_text}'")
+    
+    # Get price data; company info is filled in after the charts have rendered
+    data, query_ticker = get_price_data(symbol, days, timeframe)
     
     if data is not None and len(data) > 0:
         # Display company info
         st.header("Company Information")
-        display_company_info(info)
+        company_info_container = st.container()
         
         # Historical stock price chart
         st.header("Stock Price Chart")
@@ -503,34 +650,37 @@ def show_stock_analysis():
             ma_list = selected_ma
         
         # Create and display the price chart
-        price_chart = create_stock_chart(data, symbol, ma_list)
+        price_chart = create_stock_chart(data, symbol, days, ma_list, selected_indicators, timeframe)
         st.plotly_chart(price_chart, use_container_width=True)
         
-        # Create and display the volume chart
-        volume_chart = create_volume_chart(data, symbol)
-        st.plotly_chart(volume_chart, use_container_width=True)
-        
         # Financial metrics table
         st.header("Key Financial Metrics")
         
-        # Prepare the data for display
-        metrics_df = data.copy()
-        metrics_df = metrics_df.round(2)
-        
-        # Add moving averages to the data if selected
-        if show_ma and 'selected_ma' in locals():
-            for ma in selected_ma:
-                metrics_df[f'MA_{ma}'] = metrics_df['Close'].rolling(window=ma).mean().round(2)
+        # Prepare the data for display, reusing the chart's moving averages
+        metrics_df = data.round(2)
+        if ma_list:
+            metrics_df = metrics_df.join(indicators.get_moving_averages(symbol, data, ma_list).round(2))
         
-        # Add daily returns
-        metrics_df['Daily Return %'] = (metrics_df['Close'].pct_change() * 100).round(2)
+        # Add returns per bar
+        metrics_df[f'{timeframe} Return %'] = (metrics_df['Close'].pct_change() * 100).round(2)
         
-        # Display the data table
-        st.dataframe(metrics_df, use_container_width=True)
+        # Display the data table a page at a time
+        show_paged_table(metrics_df, "metrics_table")
         
-        # Provide download link
+        # Provide on-demand downloads
         st.markdown(f"### Download Data")
-        st.markdown(get_csv_download_link(metrics_df, f"{symbol}_stock_data.csv"), unsafe_allow_html=True)
+        show_export_controls(metrics_df, f"{symbol}_stock_data", "stock_data_export")
+        
+        with st.expander("Export several symbols"):
+            favorite_symbols = st.session_state.favorite_symbols if 'favorite_symbols' in st.session_state else []
+            bundle_text = st.text_input("Symbols (comma separated)", ", ".join(dict.fromkeys([symbol] + list(favorite_symbols))), key="export_bundle_symbols")
+            bundle_format = st.selectbox("Export Format", list(exports.EXPORT_FORMATS.keys()), key="export_bundle_format")
+            if st.button("Prepare Bundle", key="export_bundle_prepare"):
+                bundle_symbols = [s.strip().upper() for s in bundle_text.split(",") if s.strip()]
+                # Each symbol's history is loaded only when its file is written
+                frames = [(s, lambda s=s: get_price_data(s, days, timeframe)[0]) for s in bundle_symbols]
+                content, file_name, mime = exports.export_bundle(frames, f"stock_data_{timeframe.lower()}", bundle_format)
+                st.download_button(f"Download {file_name}", content, file_name=file_name, mime=mime, key="export_bundle_download", on_click="ignore")
         
         # Display latest stock stats
         st.header("Latest Stock Statistics")
@@ -563,6 +713,15 @@ def show_stock_analysis():
             
             with change_col2:
                 st.metric("% Change", f"{percent_change:.2f}%", delta=f"{percent_change:.2f}%")
+        
+        with company_info_container:
+            full_profile = st.toggle("Load full company profile", key=f"full_profile_{query_ticker}")
+            try:
+                info = get_company_info(query_ticker, full_profile)
+            except Exception as e:
+                st.warning(f"Could not load company information: {e}")
+                info = {'symbol': query_ticker}
+            display_company_info(info, query_ticker)
     else:
         st.error(f"No data found for ticker {symbol}. Please check the symbol and try again.")
 
@@ -570,20 +729,30 @@ def show_stock_analysis():
 def show_trading_platform():
     st.header("💹 Trading Platform")
     
-    # Get the symbol and data
+    # Get the symbol and its live price from the intraday buffer
     symbol = st.session_state.symbol
-    days = 30  # We'll show recent data for trading
-    data, info = get_stock_data(symbol, days)
+    try:
+        query_ticker = resolve_ticker(symbol)
+        current_price, price_time = market_data.get_live_price(query_ticker)
+    except Exception as e:
+        st.error(f"Error fetching price: {e}")
+        current_price = None
     
-    if data is None or len(data) == 0:
+    if current_price is None:
         st.error(f"Could not load data for {symbol}. Please try another symbol.")
         return
     
+    try:
+        info = get_company_info(query_ticker)
+    except Exception as e:
+        st.warning(f"Could not load company information: {e}")
+        info = {'symbol': query_ticker}
+    
     # Basic info about the stock
     st.subheader(f"Trading {info.get('longName', symbol)}")
     
-    current_price = float(data.iloc[-1]['Close'])
     st.write(f"**Current Price:** ${current_price:.2f}")
+    st.caption(f"As of {price_time:%Y-%m-%d %H:%M}")
     
     # Trading container
     st.subheader("Execute Trade")
@@ -603,21 +772,30 @@ def show_trading_platform():
             quantity = st.number_input("Quantity", min_value=1, value=10, step=1)
             
         if order_type != "Market":
+            # Seed the prices once per symbol: the live price changes on every
+            # top-up, and a changing value would reset what the user typed
+            limit_key = f"limit_price_{query_ticker}"
+            stop_key = f"stop_price_{query_ticker}_{buy_sell}"
+            if limit_key not in st.session_state:
+                st.session_state[limit_key] = round(current_price, 2)
+            if stop_key not in st.session_state:
+                st.session_state[stop_key] = round(current_price * 0.95 if buy_sell == "Buy" else current_price * 1.05, 2)
+            
             col1, col2 = st.columns(2)
             with col1:
                 limit_price = st.number_input("Limit Price", 
                                             min_value=0.01, 
-                                            value=current_price,
                                             step=0.01, 
-                                            format="%.2f")
+                                            format="%.2f",
+                                            key=limit_key)
             
             if order_type in ["Stop Loss", "Stop Limit"]:
                 with col2:
                     stop_price = st.number_input("Stop Price", 
                                             min_value=0.01, 
-                                            value=current_price * 0.95 if buy_sell == "Buy" else current_price * 1.05,
                                             step=0.01, 
-                                            format="%.2f")
+                                            format="%.2f",
+                                            key=stop_key)
         
         # Calculate estimated value
         estimated_value = quantity * current_price
@@ -725,17 +903,17 @@ def show_trading_platform():
                     total_investment = 0
                     total_current_value = 0
                     
+                    # Get current prices for all holdings in one batch
+                    quotes = market_data.quote_service.get_quotes([item[0].symbol for item in portfolio_items])
+                    
                     for item in portfolio_items:
                         stock = item[0]  # Stock object
                         quantity = item[1]  # Quantity
                         avg_price = item[2]  # Average purchase price
                         
                         # Get current price
-                        try:
-                            stock_data = yf.Ticker(stock.symbol).history(period="1d")
-                            current_price = stock_data['Close'].iloc[-1]
-                        except:
-                            current_price = avg_price  # Fallback
+                        quote = quotes.get(stock.symbol)
+                        current_price = quote["price"] if quote else avg_price  # Fallback
                         
                         market_value = quantity * current_price
                         investment = quantity * avg_price
@@ -805,24 +983,17 @@ def show_trading_platform():
         indices_names = ["Nifty 50", "Sensex", "S&P 500", "Dow Jones", "NASDAQ"]
         
         indices_data = []
+        index_quotes = market_data.quote_service.get_quotes(indices)
         
         for idx, index_symbol in enumerate(indices):
-            try:
-                index_data = yf.download(index_symbol, period="5d")
-                if len(index_data) > 1:
-                    current = index_data['Close'].iloc[-1]
-                    prev = index_data['Close'].iloc[-2]
-                    change = current - prev
-                    change_pct = (change / prev) * 100
-                    
-                    indices_data.append({
-                        "Index": indices_names[idx],
-                        "Last": f"{current:.2f}",
-                        "Change": f"{change:.2f}",
-                        "% Change": f"{change_pct:.2f}%"
-                    })
-            except:
-                continue
+            quote = index_quotes.get(index_symbol)
+            if quote and quote["previous_close"]:
+                indices_data.append({
+                    "Index": indices_names[idx],
+                    "Last": f"{quote['price']:.2f}",
+                    "Change": f"{quote['change']:.2f}",
+                    "% Change": f"{quote['change_pct']:.2f}%"
+                })
         
         if indices_data:
             st.dataframe(pd.DataFrame(indices_data), use_container_width=True)
@@ -843,23 +1014,16 @@ def show_trading_platform():
                         "Volume": []
                     }
                     
+                    quotes = market_data.quote_service.get_quotes([stock.symbol for stock in watchlist_stocks])
+                    
                     for stock in watchlist_stocks:
-                        try:
-                            stock_data = yf.Ticker(stock.symbol).history(period="2d")
-                            if len(stock_data) >= 2:
-                                current = stock_data['Close'].iloc[-1]
-                                prev = stock_data['Close'].iloc[-2]
-                                change = current - prev
-                                change_pct = (change / prev) * 100
-                                volume = stock_data['Volume'].iloc[-1]
-                                
-                                watchlist_data["Symbol"].append(stock.symbol)
-                                watchlist_data["Last Price"].append(f"${current:.2f}")
-                                watchlist_data["Change"].append(f"${change:.2f}")
-                                watchlist_data["% Change"].append(f"{change_pct:.2f}%")
-                                watchlist_data["Volume"].append(f"{int(volume):,}")
-                        except:
-                            pass
+                        quote = quotes.get(stock.symbol)
+                        if quote and quote["previous_close"]:
+                            watchlist_data["Symbol"].append(stock.symbol)
+                            watchlist_data["Last Price"].append(f"${quote['price']:.2f}")
+                            watchlist_data["Change"].append(f"${quote['change']:.2f}")
+                            watchlist_data["% Change"].append(f"{quote['change_pct']:.2f}%")
+                            watchlist_data["Volume"].append(f"{int(quote['volume']):,}")
                     
                     if watchlist_data["Symbol"]:
                         st.dataframe(pd.DataFrame(watchlist_data), use_container_width=True)
@@ -876,17 +1040,18 @@ def show_trading_platform():
         # Add to watchlist
         with st.form("add_stock_to_watchlist"):
             st.subheader("Add to Watchlist")
-            new_symbol = st.text_input("Enter Symbol")
+            new_symbol = st.text_input("Enter Symbols (comma separated)")
             submitted = st.form_submit_button("Add to Watchlist")
             
             if submitted and new_symbol and 'watchlist_id' in st.session_state:
                 try:
-                    # Add to watchlist
-                    success = db.add_stock_to_watchlist(st.session_state.watchlist_id, new_symbol.upper())
-                    if success:
-                        st.success(f"Added {new_symbol.upper()} to watchlist!")
+                    # Add every symbol in one statement
+                    new_symbols = list(dict.fromkeys(s.strip().upper() for s in new_symbol.split(",") if s.strip()))
+                    added = db.add_stocks_to_watchlist(st.session_state.watchlist_id, new_symbols)
+                    if added:
+                        st.success(f"Added {added} of {len(new_symbols)} symbols to watchlist!")
                     else:
-                        st.info(f"{new_symbol.upper()} is already in your watchlist.")
+                        st.info(f"{', '.join(new_symbols)} already in your watchlist.")
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error adding to watchlist: {e}")
@@ -1048,18 +1213,17 @@ def show_dhan_trading():
                 total_investment = 0
                 total_current_value = 0
                 
+                # Get current prices from Yahoo Finance in one batch
+                quotes = market_data.quote_service.get_quotes([item[0].symbol for item in portfolio_items])
+                
                 # Process each portfolio item
                 for item in portfolio_items:
                     stock = item[0]  # Stock object
                     quantity = item[1]  # Quantity
                     avg_price = item[2]  # Average purchase price
                     
-                    # Get current price from Yahoo Finance
-                    try:
-                        ticker_data = yf.Ticker(stock.symbol)
-                        current_price = ticker_data.history(period='1d')['Close'].iloc[-1]
-                    except:
-                        current_price = avg_price  # Fallback if can't get current price
+                    quote = quotes.get(stock.symbol)
+                    current_price = quote["price"] if quote else avg_price  # Fallback if can't get current price
                     
                     # Calculate values
                     invested = quantity * avg_price
@@ -1147,26 +1311,22 @@ def show_dhan_trading():
                         "Volume": []
                     }
                     
-                    # Get current data for each stock
+                    # Get current data for all stocks in one batch
+                    quotes = market_data.quote_service.get_quotes([stock.symbol for stock in watchlist_stocks])
+                    
                     for stock in watchlist_stocks:
-                        try:
-                            ticker_data = yf.Ticker(stock.symbol)
-                            history = ticker_data.history(period='2d')
-                            
-                            if len(history) >= 2:
-                                current_price = history['Close'].iloc[-1]
-                                prev_price = history['Close'].iloc[-2]
-                                change_pct = ((current_price - prev_price) / prev_price) * 100
-                                volume = history['Volume'].iloc[-1] / 1000
-                                volume_str = f"{volume:.1f}K" if volume < 1000 else f"{volume/1000:.2f}M"
-                                
-                                watchlist_data["Symbol"].append(stock.symbol)
-                                watchlist_data["LTP"].append(f"${current_price:.2f}")
-                                watchlist_data["Change %"].append(f"{change_pct:.2f}%")
-                                watchlist_data["Volume"].append(volume_str)
-                        except Exception as e:
-                            # Just skip this stock if there's an error
+                        quote = quotes.get(stock.symbol)
+                        if not quote or not quote["previous_close"]:
+                            # Just skip this stock if there's no data
                             continue
+                        
+                        volume = quote["volume"] / 1000
+                        volume_str = f"{volume:.1f}K" if volume < 1000 else f"{volume/1000:.2f}M"
+                        
+                        watchlist_data["Symbol"].append(stock.symbol)
+                        watchlist_data["LTP"].append(f"${quote['price']:.2f}")
+                        watchlist_data["Change %"].append(f"{quote['change_pct']:.2f}%")
+                        watchlist_data["Volume"].append(volume_str)
                     
                     if watchlist_data["Symbol"]:
                         watchlist_df = pd.DataFrame(watchlist_data)
@@ -1228,18 +1388,16 @@ def show_investment_portfolio():
             total_investment = 0
             current_value = 0
             
-            # Get latest stock prices for each item in portfolio
+            # Get latest stock prices for all items in portfolio in one batch
+            quotes = market_data.quote_service.get_quotes([item[0].symbol for item in portfolio_items])
+            
             for item in portfolio_items:
                 stock = item[0]  # Stock object
                 quantity = item[1]  # Quantity
                 avg_price = item[2]  # Average purchase price
                 
-                # Get current price from Yahoo Finance
-                try:
-                    ticker_data = yf.Ticker(stock.symbol)
-                    current_price = ticker_data.history(period='1d')['Close'].iloc[-1]
-                except:
-                    current_price = avg_price  # Fallback if can't get current price
+                quote = quotes.get(stock.symbol)
+                current_price = quote["price"] if quote else avg_price  # Fallback if can't get current price
                 
                 # Calculate values
                 invested = quantity * avg_price
@@ -1354,6 +1512,31 @@ def show_investment_portfolio():
                         st.error(f"Error adding transaction: {e}")
                 else:
                     st.error("Please fill all fields with valid values.")
+            
+            # Import a broker statement in one batch
+            with st.expander("Import Broker Statement"):
+                st.caption("CSV with Symbol, Type (Buy or Sell), Quantity and Price columns, and optionally Date")
+                statement = st.file_uploader("Statement CSV", type=["csv"], key="statement_upload")
+                if statement is not None and st.button("Import Transactions"):
+                    try:
+                        statement_df = pd.read_csv(statement)
+                        statement_df.columns = [column.strip().lower() for column in statement_df.columns]
+                        if "date" in statement_df:
+                            statement_df["date"] = pd.to_datetime(statement_df["date"])
+                        rows = [
+                            {
+                                "symbol": str(row["symbol"]).strip().upper(),
+                                "transaction_type": str(row["type"]).strip().title(),
+                                "quantity": row["quantity"],
+                                "price": row["price"],
+                                "date": row["date"].to_pydatetime() if pd.notna(row.get("date")) else None
+                            }
+                            for row in statement_df.to_dict("records")
+                        ]
+                        imported = db.import_transactions(st.session_state.user_id, rows)
+                        st.success(f"Imported {imported} transactions.")
+                    except Exception as e:
+                        st.error(f"Error importing statement: {e}")
                     
             # Recent transactions
             st.subheader("Recent Transactions")
@@ -1540,16 +1723,13 @@ def show_india_market():
     st.header("🇮🇳 India Market Dashboard (NSE)")
     
     try:
-        # Initialize NSE
-        nse = Nse()
-        
         # Show NSE Indices
         st.subheader("NSE Market Indices")
         
         # Get NIFTY data
-        nifty_data = nse.get_index_quote("nifty 50")
-        nifty_bank_data = nse.get_index_quote("nifty bank")
-        nifty_it_data = nse.get_index_quote("nifty it")
+        nifty_data = market_data.get_index_quote("nifty 50")
+        nifty_bank_data = market_data.get_index_quote("nifty bank")
+        nifty_it_data = market_data.get_index_quote("nifty it")
         
         # Display indices in metrics
         col1, col2, col3 = st.columns(3)
@@ -1589,7 +1769,7 @@ def show_india_market():
         
         # Market Status
         st.subheader("Market Status")
-        market_status = nse.get_market_status()
+        market_status = market_data.nse_request("market_status")
         if market_status:
             st.info(f"Current NSE Market Status: {market_status}")
         else:
@@ -1601,7 +1781,7 @@ def show_india_market():
         with col1:
             st.subheader("Top Gainers")
             try:
-                top_gainers = nse.get_top_gainers()
+                top_gainers = market_data.nse_request("top_gainers")
                 if top_gainers:
                     gainers_df = pd.DataFrame(top_gainers)
                     st.dataframe(gainers_df[['symbol', 'ltp', 'netPrice', 'pChange']], use_container_width=True)
@@ -1613,7 +1793,7 @@ def show_india_market():
         with col2:
             st.subheader("Top Losers")
             try:
-                top_losers = nse.get_top_losers()
+                top_losers = market_data.nse_request("top_losers")
                 if top_losers:
                     losers_df = pd.DataFrame(top_losers)
                     st.dataframe(losers_df[['symbol', 'ltp', 'netPrice', 'pChange']], use_container_width=True)
@@ -1628,7 +1808,7 @@ def show_india_market():
         
         if st.button("Get Stock Info"):
             try:
-                stock_info = nse.get_quote(nse_symbol)
+                stock_info = market_data.nse_request("stock_quote", nse_symbol)
                 if stock_info:
                     # Create columns for basic info
                     info_col1, info_col2 = st.columns(2)
@@ -1678,14 +1858,11 @@ def show_india_market():
                         st.write(f"**Book Value:** ₹{stock_info.get('bookValue', 'N/A')}")
                     
                     # Get Yahoo Finance data for charts
-                    chart_data, _ = get_stock_data(f"{nse_symbol}.NS", 90)
+                    chart_data, _ = get_price_data(f"{nse_symbol}.NS", 90)
                     if chart_data is not None and not chart_data.empty:
                         st.subheader(f"{nse_symbol} Price Chart (3 Months)")
-                        price_chart = create_stock_chart(chart_data, f"{nse_symbol}.NS", [20, 50])
+                        price_chart = create_stock_chart(chart_data, f"{nse_symbol}.NS", 90, [20, 50])
                         st.plotly_chart(price_chart, use_container_width=True)
-                        
-                        volume_chart = create_volume_chart(chart_data, f"{nse_symbol}.NS")
-                        st.plotly_chart(volume_chart, use_container_width=True)
                     else:
                         st.warning("Could not load chart data for this stock.")
                 else:
@@ -1701,12 +1878,9 @@ def show_india_market():
             if st.button("Search NSE Stocks"):
                 if search_text:
                     try:
-                        # Search all stocks
-                        all_stock_codes = nse.get_stock_codes()
-                        
-                        # Filter based on search text
-                        filtered_stocks = {k: v for k, v in all_stock_codes.items() 
-                                          if search_text.lower() in v.lower() or search_text.lower() in k.lower()}
+                        # Search the cached symbol index, best matches first
+                        matches = symbol_search.search_symbols(search_text, limit=25)
+                        filtered_stocks = {match['symbol']: match['company_name'] for match in matches}
                         
                         if filtered_stocks:
                             st.write(f"Found {len(filtered_stocks)} matches:")
@@ -1746,6 +1920,17 @@ def show_my_portfolio_tracker():
             total_investment = 0
             total_current_value = 0
             
+            # Handle Indian stocks by appending .NS if needed
+            def get_data_symbol(stock):
+                if stock.get('exchange') == 'NSE' and not stock['symbol'].endswith('.NS'):
+                    return f"{stock['symbol']}.NS"
+                return stock['symbol']
+            
+            # Get current prices for all holdings in one batch
+            quotes = market_data.quote_service.get_quotes(
+                [get_data_symbol(stock) for stock in st.session_state.my_portfolio]
+            )
+            
             for stock in st.session_state.my_portfolio:
                 symbol = stock['symbol']
                 quantity = stock['quantity']
@@ -1754,22 +1939,12 @@ def show_my_portfolio_tracker():
                 notes = stock['notes']
                 
                 # Get current price data
-                try:
-                    # Handle Indian stocks by appending .NS if needed
-                    if stock.get('exchange') == 'NSE' and not symbol.endswith('.NS'):
-                        data_symbol = f"{symbol}.NS"
-                    else:
-                        data_symbol = symbol
-                        
-                    # Get current data
-                    current_data = yf.Ticker(data_symbol).history(period="1d")
-                    if not current_data.empty:
-                        current_price = float(current_data['Close'].iloc[-1])
-                    else:
-                        current_price = buy_price  # Fallback to buy price if can't get current
-                except Exception as e:
-                    st.warning(f"Couldn't fetch current price for {symbol}: {e}")
-                    current_price = buy_price  # Fallback
+                quote = quotes.get(get_data_symbol(stock))
+                if quote:
+                    current_price = quote["price"]
+                else:
+                    st.warning(f"Couldn't fetch current price for {symbol}")
+                    current_price = buy_price  # Fallback to buy price if can't get current
                 
                 # Calculate values
                 investment = quantity * buy_price
@@ -1893,11 +2068,8 @@ def show_my_portfolio_tracker():
                 
                 st.plotly_chart(performance_fig, use_container_width=True)
                 
-                # Option to download portfolio data as CSV
-                csv = portfolio_df.to_csv(index=False)
-                b64 = base64.b64encode(csv.encode()).decode()
-                href = f'<a href="data:file/csv;base64,{b64}" download="my_portfolio.csv">Download Portfolio Data as CSV</a>'
-                st.markdown(href, unsafe_allow_html=True)
+                # Option to download portfolio data
+                show_export_controls(portfolio_df, "my_portfolio", "portfolio_export", index=False)
     
     with portfolio_tabs[1]:  # Add/Update Stock
         st.subheader("Add or Update Stock in Portfolio")
@@ -2092,11 +2264,8 @@ def show_my_portfolio_tracker():
             history_df = pd.DataFrame(history_data)
             st.dataframe(history_df, use_container_width=True)
             
-            # Option to download history as CSV
-            csv = history_df.to_csv(index=False)
-            b64 = base64.b64encode(csv.encode()).decode()
-            href = f'<a href="data:file/csv;base64,{b64}" download="trade_history.csv">Download Trade History as CSV</a>'
-            st.markdown(href, unsafe_allow_html=True)
+            # Option to download history
+            show_export_controls(history_df, "trade_history", "trade_history_export", index=False)
     
     with portfolio_tabs[3]:  # Performance Analytics
         st.subheader("Portfolio Performance Analytics")
@@ -2138,7 +2307,7 @@ def show_my_portfolio_tracker():
                     
                     # Fetch historical data
                     try:
-                        hist_data = yf.download(data_symbol, start=start_date, end=end_date)
+                        hist_data = market_data.download_history(data_symbol, start_date, end_date)
                         
                         if not hist_data.empty:
                             # Calculate daily values for this stock
@@ -2162,7 +2331,7 @@ def show_my_portfolio_tracker():
                 
                 # Add benchmark comparison (S&P 500)
                 try:
-                    benchmark = yf.download('^GSPC', start=start_date, end=end_date)
+                    benchmark = market_data.download_history('^GSPC', start_date, end_date)
                     if not benchmark.empty:
                         benchmark_norm = benchmark['Close'] / benchmark['Close'].iloc[0] * 100 - 100
                         stock_fig.add_trace(go.Scatter(
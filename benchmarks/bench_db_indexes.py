@@ -0,0 +1,159 @@
+# Benchmark the hot database lookups with and without the composite indexes,
+# at 1M transactions and 100k watchlist items. Runs the statements the helpers
+# in database.py run, full rows included, and prints each plan and latency.
+# Run from the repository root: python benchmarks/bench_db_indexes.py
+# Uses a throwaway SQLite file; set BENCH_DATABASE_URL to run against a scratch
+# Postgres database instead (its tables are dropped and refilled).
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch_dir}/bench.db")
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+import database as db
+
+USERS = 1_000
+STOCKS = 2_000
+WATCHLISTS_PER_USER = 10
+ITEMS_PER_WATCHLIST = 10  # 100k watchlist items
+PORTFOLIO_ITEMS_PER_USER = 20
+TRANSACTIONS = 1_000_000
+ALERTS = 50_000
+BATCH = 50_000
+SAMPLES = 200
+
+# Indexes added for the helpers' access paths
+NEW_INDEXES = [
+    index
+    for model in (db.Watchlist, db.WatchlistItem, db.Portfolio, db.PortfolioItem, db.Transaction, db.Alert)
+    for index in model.__table__.indexes
+    if len(index.columns) > 1 or "user_id" in index.columns
+]
+
+def insert(connection, table, rows):
+    for start in range(0, len(rows), BATCH):
+        connection.execute(table.insert(), rows[start:start + BATCH])
+
+def seed(rng):
+    users = range(1, USERS + 1)
+    stocks = range(1, STOCKS + 1)
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        insert(connection, db.User.__table__, [{"id": u, "username": f"user{u}", "email": f"user{u}@example.com"} for u in users])
+        insert(connection, db.Stock.__table__, [{"id": s, "symbol": f"SYM{s}", "company_name": f"Company {s}"} for s in stocks])
+        insert(connection, db.Watchlist.__table__, [
+            {"id": (u - 1) * WATCHLISTS_PER_USER + w + 1, "name": f"List {w}", "user_id": u}
+            for u in users for w in range(WATCHLISTS_PER_USER)
+        ])
+        insert(connection, db.WatchlistItem.__table__, [
+            {"watchlist_id": w, "stock_id": s}
+            for w in range(1, USERS * WATCHLISTS_PER_USER + 1) for s in rng.sample(stocks, ITEMS_PER_WATCHLIST)
+        ])
+        insert(connection, db.Portfolio.__table__, [{"id": u, "name": "My Portfolio", "user_id": u} for u in users])
+        insert(connection, db.PortfolioItem.__table__, [
+            {"portfolio_id": u, "stock_id": s, "quantity": 10, "average_price": 100.0}
+            for u in users for s in rng.sample(stocks, PORTFOLIO_ITEMS_PER_USER)
+        ])
+        insert(connection, db.Transaction.__table__, [
+            {
+                "user_id": rng.randint(1, USERS),
+                "stock_id": rng.randint(1, STOCKS),
+                "transaction_type": rng.choice(("Buy", "Sell")),
+                "quantity": 1,
+                "price": 100.0,
+                "date": now - timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60)),
+            }
+            for _ in range(TRANSACTIONS)
+        ])
+        insert(connection, db.Alert.__table__, [
+            {"user_id": rng.randint(1, USERS), "stock_id": rng.randint(1, STOCKS), "alert_type": "Price Above", "value": 100.0, "active": rng.random() < 0.5}
+            for _ in range(ALERTS)
+        ])
+
+# The statements the helpers in database.py run, each with a parameter generator
+def queries(rng):
+    return {
+        "remove_stock_from_watchlist": lambda: select(db.WatchlistItem).where(
+            db.WatchlistItem.watchlist_id == rng.randint(1, USERS * WATCHLISTS_PER_USER),
+            db.WatchlistItem.stock_id == rng.randint(1, STOCKS)).limit(1),
+        "add_stocks_to_watchlist": lambda: select(db.WatchlistItem.stock_id).where(
+            db.WatchlistItem.watchlist_id == rng.randint(1, USERS * WATCHLISTS_PER_USER)),
+        "get_watchlist_stocks": lambda: select(db.Stock).join(db.WatchlistItem, db.WatchlistItem.stock_id == db.Stock.id).where(
+            db.WatchlistItem.watchlist_id == rng.randint(1, USERS * WATCHLISTS_PER_USER)),
+        "get_user_watchlists": lambda: select(db.Watchlist).where(db.Watchlist.user_id == rng.randint(1, USERS)),
+        "trade: lock portfolio": lambda: select(db.Portfolio).where(
+            db.Portfolio.user_id == rng.randint(1, USERS)).order_by(db.Portfolio.id).limit(1),
+        "trade: read holdings": lambda: select(db.PortfolioItem.stock_id, db.PortfolioItem.quantity, db.PortfolioItem.average_price).where(
+            db.PortfolioItem.portfolio_id == rng.randint(1, USERS),
+            db.PortfolioItem.stock_id.in_(rng.sample(range(1, STOCKS + 1), 3))),
+        "get_portfolio_items": lambda: select(db.Stock, db.PortfolioItem.quantity, db.PortfolioItem.average_price).join(
+            db.PortfolioItem, db.PortfolioItem.stock_id == db.Stock.id).where(db.PortfolioItem.portfolio_id == rng.randint(1, USERS)),
+        "get_user_transactions": lambda: select(db.Transaction, db.Stock.symbol).join(db.Stock, db.Transaction.stock_id == db.Stock.id).where(
+            db.Transaction.user_id == rng.randint(1, USERS)).order_by(db.Transaction.date.desc()).limit(20),
+        "get_user_alerts": lambda: select(db.Alert, db.Stock.symbol).join(db.Stock, db.Alert.stock_id == db.Stock.id).where(
+            db.Alert.user_id == rng.randint(1, USERS), db.Alert.active == True),
+    }
+
+def explain(connection, statement):
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    rows = connection.execute(text(prefix + sql)).all()
+    return " | ".join(str(row[-1]) for row in rows)
+
+def measure(label, rng):
+    print(f"\n{label}")
+    results = {}
+    with db.engine.connect() as connection, Session(bind=connection) as session:
+        for name, build in queries(rng).items():
+            print(f"  {name:<28} {explain(connection, build())}")
+            timings = []
+            for _ in range(SAMPLES):
+                statement = build()
+                start = time.perf_counter()
+                # Through a session, so loading the ORM rows is timed too
+                session.execute(statement).all()
+                session.expunge_all()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = (statistics.median(timings), timings[int(len(timings) * 0.95)])
+    return results
+
+def main():
+    rng = random.Random(42)
+    db.Base.metadata.drop_all(bind=db.engine)
+    db.Base.metadata.create_all(bind=db.engine)
+    for index in NEW_INDEXES:
+        index.drop(bind=db.engine)
+
+    print(f"Seeding {TRANSACTIONS:,} transactions and {USERS * WATCHLISTS_PER_USER * ITEMS_PER_WATCHLIST:,} watchlist items...")
+    start = time.perf_counter()
+    seed(rng)
+    print(f"Seeded in {time.perf_counter() - start:.1f} s")
+
+    before = measure("Without composite indexes", random.Random(1))
+    for index in NEW_INDEXES:
+        index.create(bind=db.engine)
+    with db.engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    after = measure("With composite indexes", random.Random(1))
+
+    print(f"\n{'query':<28} {'before p50/p95 ms':>20} {'after p50/p95 ms':>20}")
+    for name in before:
+        print(f"{name:<28} {before[name][0]:>9.3f} / {before[name][1]:<8.3f} {after[name][0]:>9.3f} / {after[name][1]:<8.3f}")
+
+    db.engine.dispose()
+    shutil.rmtree(_scratch_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+# Benchmark the indicator library on 5 years of daily bars.
+# Run from the repository root: python benchmarks/bench_indicators.py
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators
+from providers import FixtureProvider
+
+BUDGET_MS = 1.0
+REPEAT = 7
+NUMBER = 50
+
+def main():
+    # Deterministic offline bars, so runs are comparable between machines
+    data = FixtureProvider().history("BENCH", period="5y")
+    print(f"{len(data)} daily bars, best of {REPEAT} x {NUMBER} runs")
+
+    cases = {"MA 5/20/50/100/200": lambda: indicators.compute_moving_averages(data["Close"], (5, 20, 50, 100, 200))}
+    for name in indicators.INDICATORS:
+        cases[name] = lambda name=name: indicators.compute_indicators(data, [name])
+    cases["All indicators"] = lambda: indicators.compute_indicators(data, list(indicators.INDICATORS))
+
+    over_budget = 0
+    for name, run in cases.items():
+        best = min(timeit.repeat(run, number=NUMBER, repeat=REPEAT)) / NUMBER * 1000
+        within = best < BUDGET_MS or name == "All indicators"
+        over_budget += not within
+        print(f"{name:<20} {best:8.3f} ms{'' if within else '  over budget'}")
+
+    # Memoised lookups are what pages pay after the first render
+    indicators.get_indicators("BENCH", data, list(indicators.INDICATORS))
+    cached = min(timeit.repeat(lambda: indicators.get_indicators("BENCH", data, list(indicators.INDICATORS)), number=NUMBER, repeat=REPEAT)) / NUMBER * 1000
+    print(f"{'Cached lookup':<20} {cached:8.3f} ms")
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
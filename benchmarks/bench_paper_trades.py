@@ -0,0 +1,88 @@
+# Benchmark concurrent paper trades: trades recorded per second by several threads,
+# then a check that every position still matches a replay of its ledger.
+# Run from the repository root: python benchmarks/bench_paper_trades.py
+# Uses a throwaway SQLite file; set BENCH_DATABASE_URL to run against a scratch
+# Postgres database instead (its tables are dropped and refilled).
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch_dir}/bench.db")
+
+import database as db
+
+THREADS = 8
+TRADES_PER_THREAD = 250
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "NVDA", "TSLA"]
+
+def trade_loop(user_ids, seed, failures):
+    rng = random.Random(seed)
+    for _ in range(TRADES_PER_THREAD):
+        # Mostly buys, so sells usually have something to reduce
+        transaction_type = "Buy" if rng.random() < 0.7 else "Sell"
+        try:
+            db.add_stock_transaction(rng.choice(user_ids), rng.choice(SYMBOLS), transaction_type, rng.randint(1, 10), round(rng.uniform(50, 500), 2))
+        except Exception as e:
+            failures.append(e)
+
+# Replay each user's ledger in commit order and compare it with the stored positions
+def count_mismatches(user_ids):
+    mismatches = 0
+    with db.session_scope() as session:
+        for user_id in user_ids:
+            ledger = session.query(db.Transaction, db.Stock.symbol).join(db.Stock, db.Transaction.stock_id == db.Stock.id).filter(
+                db.Transaction.user_id == user_id).order_by(db.Transaction.id).all()
+            expected = {}
+            for transaction, symbol in ledger:
+                expected[symbol] = db._apply_trade(expected.get(symbol), transaction.transaction_type, transaction.quantity, transaction.price)
+            portfolio = session.query(db.Portfolio).filter(db.Portfolio.user_id == user_id).order_by(db.Portfolio.id).first()
+            stored = {
+                symbol: (quantity, average_price)
+                for symbol, quantity, average_price in session.query(db.Stock.symbol, db.PortfolioItem.quantity, db.PortfolioItem.average_price).join(
+                    db.PortfolioItem, db.PortfolioItem.stock_id == db.Stock.id).filter(db.PortfolioItem.portfolio_id == portfolio.id)
+            }
+            for symbol in SYMBOLS:
+                want, have = expected.get(symbol), stored.get(symbol)
+                if (want is None) != (have is None) or (want and (abs(want[0] - have[0]) > 1e-6 or abs(want[1] - have[1]) > 1e-6)):
+                    mismatches += 1
+    return mismatches
+
+# Each thread trades for user_ids[thread number % len(user_ids)]
+def run(label, user_ids):
+    failures = []
+    threads = [threading.Thread(target=trade_loop, args=([user_ids[seed % len(user_ids)]], seed, failures)) for seed in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    trades = THREADS * TRADES_PER_THREAD - len(failures)
+    print(f"{label:<26} {trades / elapsed:8.0f} trades/s  failed {len(failures):>4}  positions off ledger {count_mismatches(user_ids)}")
+
+def main():
+    db.Base.metadata.drop_all(bind=db.engine)
+    db.create_tables()
+    users = [db.get_or_create_user(f"trader{i}", f"trader{i}@example.com").id for i in range(THREADS)]
+    # Create the stocks and portfolios up front so the runs only measure trades
+    for user_id in users:
+        db.import_transactions(user_id, [{"symbol": symbol, "transaction_type": "Buy", "quantity": 100, "price": 100.0} for symbol in SYMBOLS])
+
+    print(f"{THREADS} threads x {TRADES_PER_THREAD} paper trades on {db.engine.dialect.name}")
+    run("one shared portfolio", users[:1])
+    run("one portfolio per thread", users)
+
+    db.engine.dispose()
+    shutil.rmtree(_scratch_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import os
+import threading
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+import database as db
+import market_data
+
+# Refresh more often while NSE or NYSE is trading
+MARKET_HOURS_INTERVAL = 60  # seconds
+OFF_HOURS_INTERVAL = 900  # seconds
+HISTORY_DAYS = 365
+
+# Regular trading sessions (exchange holidays are not tracked)
+MARKET_SESSIONS = {
+    "NSE": (ZoneInfo("Asia/Kolkata"), dtime(9, 15), dtime(15, 30)),
+    "NYSE": (ZoneInfo("America/New_York"), dtime(9, 30), dtime(16, 0)),
+}
+
+# Function to check whether any tracked exchange is in its trading session
+def is_market_open(now=None):
+    now = now or datetime.now(tz=ZoneInfo("UTC"))
+    for timezone, session_open, session_close in MARKET_SESSIONS.values():
+        local_now = now.astimezone(timezone)
+        if local_now.weekday() < 5 and session_open <= local_now.time() <= session_close:
+            return True
+    return False
+
+# Function to refresh the daily symbol master and open intraday buffers, then
+# quotes and recent history for every tracked symbol
+def warm_once():
+    try:
+        market_data.refresh_symbol_master_if_stale()
+    except Exception as e:
+        print(f"Cache warmer could not refresh the symbol master: {e}")
+
+    # Keep the intraday buffers pages are reading current while a market trades,
+    # and let go of the ones nobody has looked at for a while
+    try:
+        if is_market_open():
+            market_data.refresh_intraday_buffers()
+        else:
+            market_data.drop_idle_intraday_buffers()
+    except Exception as e:
+        print(f"Cache warmer could not refresh intraday bars: {e}")
+
+    symbols = db.get_tracked_symbols()
+    if not symbols:
+        return 0
+
+    # Pages look quotes up by the stored symbol, history by the resolved one
+    try:
+        market_data.quote_service.refresh(symbols)
+    except Exception as e:
+        print(f"Cache warmer could not refresh quotes: {e}")
+    for symbol in symbols:
+        try:
+            query_ticker = market_data.resolve_symbol(symbol) or symbol
+            market_data.get_history_window(query_ticker, HISTORY_DAYS)
+        except Exception as e:
+            print(f"Cache warmer could not refresh history for {symbol}: {e}")
+    return len(symbols)
+
+class CacheWarmer(threading.Thread):
+    def __init__(self):
+        super().__init__(name="cache-warmer", daemon=True)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                warm_once()
+            except Exception as e:
+                print(f"Cache warmer error: {e}")
+            interval = MARKET_HOURS_INTERVAL if is_market_open() else OFF_HOURS_INTERVAL
+            self.stop_event.wait(interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+# Function to start the cache warmer once per process (set CACHE_WARMER=0 to disable)
+def start_cache_warmer():
+    global _warmer
+    if os.environ.get("CACHE_WARMER", "1") == "0":
+        return None
+    with _warmer_lock:
+        if _warmer is None or not _warmer.is_alive():
+            _warmer = CacheWarmer()
+            _warmer.start()
+    return _warmer
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+import pandas as pd
+from indicators import LRUCache
+
+# Charts are drawn for a viewport of this many pixels; a browser cannot show
+# more than one bar per few pixels, so anything beyond that is wasted payload
+CHART_VIEWPORT_WIDTH = int(os.getenv("CHART_VIEWPORT_WIDTH", "1200"))
+PIXELS_PER_CANDLE = 3
+PIXELS_PER_LINE_POINT = 2
+
+# Built figures, keyed by everything that changes what they show
+FIGURE_CACHE_SIZE = 64
+figure_cache = LRUCache(max_size=FIGURE_CACHE_SIZE)
+
+def max_candles(viewport_width=CHART_VIEWPORT_WIDTH):
+    return max(1, viewport_width // PIXELS_PER_CANDLE)
+
+def max_line_points(viewport_width=CHART_VIEWPORT_WIDTH):
+    return max(2, viewport_width // PIXELS_PER_LINE_POINT)
+
+# Start offsets of buckets of `size` bars, aligned so the last bucket ends on
+# the latest bar (only the oldest bucket can be partial)
+def _bucket_starts(n, size):
+    first = n - ((n - 1) // size) * size
+    return np.concatenate(([0], np.arange(first, n, size))).astype(np.intp)
+
+# Function to re-aggregate OHLCV bars into at most max_bars coarser candles
+def downsample_ohlc(data, max_bars=None):
+    max_bars = max_bars or max_candles()
+    n = len(data)
+    if n <= max_bars:
+        return data
+
+    size = -(-n // max_bars)  # ceil
+    starts = _bucket_starts(n, size)
+    ends = np.append(starts[1:], n) - 1
+
+    columns = {}
+    if "Open" in data:
+        columns["Open"] = data["Open"].to_numpy()[starts]
+    if "High" in data:
+        columns["High"] = np.fmax.reduceat(data["High"].to_numpy(dtype=np.float64), starts)
+    if "Low" in data:
+        columns["Low"] = np.fmin.reduceat(data["Low"].to_numpy(dtype=np.float64), starts)
+    if "Close" in data:
+        columns["Close"] = data["Close"].to_numpy()[ends]
+    if "Volume" in data:
+        columns["Volume"] = np.add.reduceat(np.nan_to_num(data["Volume"].to_numpy(dtype=np.float64)), starts)
+
+    # Each candle is dated by the first bar it covers
+    return pd.DataFrame(columns, index=data.index[starts])
+
+# Function to thin a line series to at most max_points with min-max bucketing:
+# every bucket keeps its lowest and highest point, so spikes survive
+def downsample_series(series, max_points=None):
+    max_points = max_points or max_line_points()
+    n = len(series)
+    if n <= max_points:
+        return series
+
+    size = -(-n // (max_points // 2))
+    buckets = -(-n // size)
+    pad = buckets * size - n
+
+    # Pad the oldest bucket so every row has `size` values
+    values = np.concatenate((np.full(pad, np.nan), series.to_numpy(dtype=np.float64))).reshape(buckets, size)
+    lows = np.argmin(np.where(np.isnan(values), np.inf, values), axis=1)
+    highs = np.argmax(np.where(np.isnan(values), -np.inf, values), axis=1)
+
+    offsets = np.arange(buckets) * size - pad
+    # Always keep the latest point so the line ends on the current value
+    keep = np.unique(np.concatenate((offsets + lows, offsets + highs, [n - 1])).clip(0, n - 1))
+    return series.iloc[keep]
@@ -1,10 +1,15 @@
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import streamlit as st
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Table, MetaData
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index, Table, MetaData, UniqueConstraint, func, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 import datetime
 import json
+import math
 
 # Get the database URL from environment variables
 DATABASE_URL = os.environ.get("DATABASE_URL")
@@ -19,18 +24,76 @@ else:
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Connection pool settings, overridable per deployment
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))  # connections kept open
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))  # extra connections allowed under load
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") != "0"  # test connections before handing them out
+SQLITE_BUSY_TIMEOUT = 30  # seconds a SQLite writer waits for the lock
+
 # Create SQLAlchemy engine and session with proper SSL handling
 if "postgresql" in DATABASE_URL:
     engine = create_engine(
         DATABASE_URL, 
-        connect_args={"sslmode": "allow"}
+        connect_args={"sslmode": "allow"},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
     )
+elif ":memory:" in DATABASE_URL or DATABASE_URL in ("sqlite://", "sqlite:///"):
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 else:
-    engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # The cache warmer writes from its own thread, so connections are shared across threads
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+
+if engine.dialect.name == "sqlite":
+    # WAL lets pages read while the cache warmer writes; NORMAL sync is safe with WAL
+    @event.listens_for(engine, "connect")
+    def _tune_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+        # Transactions are started by _begin_sqlite below, not by the driver
+        dbapi_connection.isolation_level = None
+
+    # BEGIN IMMEDIATE takes SQLite's write lock up front for sessions that ask for it
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite(connection):
+        connection.exec_driver_sql(connection.get_execution_options().get("sqlite_begin", "BEGIN"))
+
+# Pool activity since start-up: many connects per checkout means connections are churning
+pool_events = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+_pool_events_lock = threading.Lock()
+
+def _count_pool_event(name):
+    def listener(*args):
+        with _pool_events_lock:
+            pool_events[name] += 1
+    return listener
+
+event.listen(engine, "connect", _count_pool_event("connects"))
+event.listen(engine, "checkout", _count_pool_event("checkouts"))
+event.listen(engine, "checkin", _count_pool_event("checkins"))
+event.listen(engine, "invalidate", _count_pool_event("invalidations"))
+
+# Objects stay readable after their session commits and closes
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 # Define database models
+# Composite indexes follow the helpers' filters. Pairs that must be unique use
+# unique indexes rather than constraints, so older databases can be given the
+# same object (SQLite cannot add a constraint to an existing table).
 class User(Base):
     __tablename__ = "users"
     
@@ -52,6 +115,8 @@ class Stock(Base):
     company_name = Column(String)
     sector = Column(String)
     industry = Column(String)
+    exchange_suffix = Column(String)  # ".NS", ".BO" or "" for US listings
+    isin = Column(String)
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationships
@@ -64,7 +129,7 @@ class Watchlist(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationships
@@ -73,6 +138,9 @@ class Watchlist(Base):
 
 class WatchlistItem(Base):
     __tablename__ = "watchlist_items"
+    __table_args__ = (
+        Index("uq_watchlist_items_watchlist_stock", "watchlist_id", "stock_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     watchlist_id = Column(Integer, ForeignKey("watchlists.id"))
@@ -85,10 +153,14 @@ class WatchlistItem(Base):
 
 class Portfolio(Base):
     __tablename__ = "portfolios"
+    __table_args__ = (
+        # Lets concurrent first trades create a user's default portfolio only once
+        Index("uq_portfolios_user_name", "user_id", "name", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationships
@@ -97,6 +169,9 @@ class Portfolio(Base):
 
 class PortfolioItem(Base):
     __tablename__ = "portfolio_items"
+    __table_args__ = (
+        Index("uq_portfolio_items_portfolio_stock", "portfolio_id", "stock_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     portfolio_id = Column(Integer, ForeignKey("portfolios.id"))
@@ -110,6 +185,10 @@ class PortfolioItem(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Read newest first; both SQLite and Postgres scan the index backwards for that
+        Index("ix_transactions_user_date", "user_id", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -135,6 +214,9 @@ class UserPreference(Base):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_user_active", "user_id", "active"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -144,337 +226,612 @@ class Alert(Base):
     active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+class PriceHistory(Base):
+    __tablename__ = "price_history"
+    __table_args__ = (
+        UniqueConstraint("symbol", "date", name="uq_price_history_symbol_date"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, index=True)  # Exchange-qualified symbol, e.g. TATASTEEL.NS
+    date = Column(DateTime)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    volume = Column(Float)
+
 # Create all tables in the database
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
+# Bring tables created by older versions up to date
+def migrate_schema():
+    inspector = inspect(engine)
+    if "stocks" not in inspector.get_table_names():
+        return
+    
+    existing_columns = {column["name"] for column in inspector.get_columns("stocks")}
+    with engine.begin() as connection:
+        for column_name in ["exchange_suffix", "isin"]:
+            if column_name not in existing_columns:
+                connection.execute(text(f"ALTER TABLE stocks ADD COLUMN {column_name} VARCHAR"))
+    
+    # Indexes added after the tables were first created
+    for model in (Watchlist, WatchlistItem, Portfolio, PortfolioItem, Transaction, Alert):
+        table = model.__table__
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        with engine.begin() as connection:
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.unique and model is Portfolio:
+                    _rename_duplicate_portfolios(connection)
+                elif index.unique:
+                    # Older versions could store the same pair twice
+                    _merge_duplicate_rows(connection, model)
+                index.create(bind=connection)
+
+# Fold rows that repeat a (list, stock) pair into the oldest one, so a unique index can be built
+def _merge_duplicate_rows(connection, model):
+    owner = model.watchlist_id if model is WatchlistItem else model.portfolio_id
+    duplicates = connection.execute(
+        select(owner, model.stock_id).group_by(owner, model.stock_id).having(func.count() > 1)
+    ).all()
+    for owner_id, stock_id in duplicates:
+        rows = connection.execute(
+            select(model.__table__).where(owner == owner_id, model.stock_id == stock_id).order_by(model.id)
+        ).all()
+        keep, extra = rows[0], [row.id for row in rows[1:]]
+        if model is PortfolioItem:
+            # One holding: total quantity at the quantity-weighted average price
+            quantity = sum(row.quantity or 0 for row in rows)
+            cost = sum((row.quantity or 0) * (row.average_price or 0) for row in rows)
+            connection.execute(
+                PortfolioItem.__table__.update().where(PortfolioItem.id == keep.id).values(
+                    quantity=quantity,
+                    average_price=cost / quantity if quantity else keep.average_price
+                )
+            )
+        connection.execute(model.__table__.delete().where(model.id.in_(extra)))
+
+# Give every portfolio but the oldest of a user's same-named ones a distinct name,
+# so a unique index can be built without touching their holdings
+def _rename_duplicate_portfolios(connection):
+    duplicates = connection.execute(
+        select(Portfolio.user_id, Portfolio.name).group_by(Portfolio.user_id, Portfolio.name).having(func.count() > 1)
+    ).all()
+    for user_id, name in duplicates:
+        rows = connection.execute(
+            select(Portfolio.id).where(Portfolio.user_id == user_id, Portfolio.name == name).order_by(Portfolio.id)
+        ).all()
+        for row in rows[1:]:
+            connection.execute(
+                Portfolio.__table__.update().where(Portfolio.id == row.id).values(name=f"{name} ({row.id})")
+            )
+
 # Database helper functions
-def get_db():
+# Unit of work: commit when the block finishes, roll back if it raises, always close.
+# lock_for_write is for read-modify-write work: on SQLite the transaction takes the
+# write lock when it starts (Postgres callers lock their rows with FOR UPDATE).
+@contextmanager
+def session_scope(lock_for_write=False):
     db = SessionLocal()
     try:
-        return db
+        if lock_for_write and engine.dialect.name == "sqlite":
+            db.connection(execution_options={"sqlite_begin": "BEGIN IMMEDIATE"})
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
+# Open a session the caller must close; prefer session_scope()
+def get_db():
+    return SessionLocal()
+
+# Connection pool usage and the event counts above
+def get_pool_status():
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    with _pool_events_lock:
+        status.update(pool_events)
+    return status
+
 # Initialize database with demo data
 def initialize_demo_data():
-    db = get_db()
-    
-    # Check if we already have data
-    existing_user = db.query(User).first()
-    if existing_user:
-        db.close()
-        return
-    
-    # Create demo user
-    demo_user = User(username="demo_user", email="demo@example.com")
-    db.add(demo_user)
-    db.commit()
-    db.refresh(demo_user)
-    
-    # Add default watchlist
-    default_watchlist = Watchlist(name="My Watchlist", user_id=demo_user.id)
-    db.add(default_watchlist)
-    db.commit()
-    db.refresh(default_watchlist)
-    
-    # Add default portfolio
-    default_portfolio = Portfolio(name="My Portfolio", user_id=demo_user.id)
-    db.add(default_portfolio)
-    db.commit()
-    db.refresh(default_portfolio)
-    
-    # Add some stocks
-    stock_data = [
-        {"symbol": "AAPL", "company_name": "Apple Inc.", "sector": "Technology", "industry": "Consumer Electronics"},
-        {"symbol": "MSFT", "company_name": "Microsoft Corporation", "sector": "Technology", "industry": "Software"},
-        {"symbol": "GOOGL", "company_name": "Alphabet Inc.", "sector": "Technology", "industry": "Internet Services"},
-        {"symbol": "AMZN", "company_name": "Amazon.com Inc.", "sector": "Consumer Cyclical", "industry": "Internet Retail"},
-        {"symbol": "TSLA", "company_name": "Tesla, Inc.", "sector": "Consumer Cyclical", "industry": "Auto Manufacturers"},
-        {"symbol": "NVDA", "company_name": "NVIDIA Corporation", "sector": "Technology", "industry": "Semiconductors"},
-        {"symbol": "META", "company_name": "Meta Platforms, Inc.", "sector": "Technology", "industry": "Internet Services"},
-        {"symbol": "NFLX", "company_name": "Netflix, Inc.", "sector": "Communication Services", "industry": "Entertainment"},
-    ]
-    
-    for stock_info in stock_data:
-        stock = Stock(**stock_info)
-        db.add(stock)
-    
-    db.commit()
-    
-    # Add stocks to watchlist
-    for symbol in ["AAPL", "MSFT", "GOOGL", "AMZN"]:
-        stock = db.query(Stock).filter(Stock.symbol == symbol).first()
-        if stock:
-            watchlist_item = WatchlistItem(watchlist_id=default_watchlist.id, stock_id=stock.id)
-            db.add(watchlist_item)
+    with session_scope() as db:
+        # Check if we already have data
+        existing_user = db.query(User).first()
+        if existing_user:
+            return
+        
+        # Create demo user
+        demo_user = User(username="demo_user", email="demo@example.com")
+        db.add(demo_user)
+        db.flush()
+        
+        # Add default watchlist
+        default_watchlist = Watchlist(name="My Watchlist", user_id=demo_user.id)
+        db.add(default_watchlist)
+        
+        # Add default portfolio
+        default_portfolio = Portfolio(name="My Portfolio", user_id=demo_user.id)
+        db.add(default_portfolio)
+        db.flush()
+        
+        # Add some stocks
+        stock_data = [
+            {"symbol": "AAPL", "company_name": "Apple Inc.", "sector": "Technology", "industry": "Consumer Electronics"},
+            {"symbol": "MSFT", "company_name": "Microsoft Corporation", "sector": "Technology", "industry": "Software"},
+            {"symbol": "GOOGL", "company_name": "Alphabet Inc.", "sector": "Technology", "industry": "Internet Services"},
+            {"symbol": "AMZN", "company_name": "Amazon.com Inc.", "sector": "Consumer Cyclical", "industry": "Internet Retail"},
+            {"symbol": "TSLA", "company_name": "Tesla, Inc.", "sector": "Consumer Cyclical", "industry": "Auto Manufacturers"},
+            {"symbol": "NVDA", "company_name": "NVIDIA Corporation", "sector": "Technology", "industry": "Semiconductors"},
+            {"symbol": "META", "company_name": "Meta Platforms, Inc.", "sector": "Technology", "industry": "Internet Services"},
+            {"symbol": "NFLX", "company_name": "Netflix, Inc.", "sector": "Communication Services", "industry": "Entertainment"},
+        ]
+        db.execute(_dialect_insert(Stock.__table__).on_conflict_do_nothing(), stock_data)
+        
+        # Add stocks to watchlist
+        _add_stocks_to_watchlist(db, default_watchlist.id, ["AAPL", "MSFT", "GOOGL", "AMZN"])
+        
+        # Add stocks to portfolio with sample holdings, through their "buy" transactions
+        portfolio_data = [
+            {"symbol": "AAPL", "quantity": 10, "average_price": 155.75},
+            {"symbol": "MSFT", "quantity": 5, "average_price": 285.30},
+            {"symbol": "GOOGL", "quantity": 3, "average_price": 125.50},
+            {"symbol": "NVDA", "quantity": 8, "average_price": 212.80},
+        ]
+        _import_transactions(db, demo_user.id, [
+            {
+                "symbol": item["symbol"],
+                "transaction_type": "Buy",
+                "quantity": item["quantity"],
+                "price": item["average_price"],
+                "date": datetime.datetime.now() - datetime.timedelta(days=30)
+            }
+            for item in portfolio_data
+        ])
+        
+        # Add user preferences
+        favorite_symbols = json.dumps(["AAPL", "MSFT", "GOOGL"])
+        chart_preferences = json.dumps({
+            "show_moving_averages": True,
+            "default_ma_periods": [20, 50],
+            "default_chart_type": "candlestick",
+            "show_volume": True
+        })
+        
+        user_prefs = UserPreference(
+            user_id=demo_user.id,
+            theme="light",
+            default_app="Stock Analysis",
+            favorite_symbols=favorite_symbols,
+            chart_preferences=chart_preferences
+        )
+        db.add(user_prefs)
+        
+        # Add sample alerts
+        alert_data = [
+            {"symbol": "AAPL", "alert_type": "Price Above", "value": 180.0},
+            {"symbol": "MSFT", "alert_type": "Price Below", "value": 260.0},
+            {"symbol": "TSLA", "alert_type": "% Change", "value": 5.0},
+        ]
+        stock_ids = _get_or_create_stock_ids(db, [alert_info["symbol"] for alert_info in alert_data])
+        db.execute(Alert.__table__.insert(), [
+            {
+                "user_id": demo_user.id,
+                "stock_id": stock_ids[alert_info["symbol"]],
+                "alert_type": alert_info["alert_type"],
+                "value": alert_info["value"]
+            }
+            for alert_info in alert_data
+        ])
+
+# Split an exchange-qualified symbol into its bare ticker and suffix
+def split_symbol(symbol):
+    for suffix in (".NS", ".BO"):
+        if symbol.endswith(suffix):
+            return symbol[:-len(suffix)], suffix
+    return symbol, None
+
+# Bulk writes send at most this many rows or IN-list values per statement
+BULK_BATCH_SIZE = 1000
+
+def _chunks(items, size=BULK_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# INSERT for the engine's dialect, which can skip or update rows that hit a
+# unique index (ON CONFLICT on Postgres, INSERT OR IGNORE/ON CONFLICT on SQLite)
+def _dialect_insert(table):
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+# Stock ids by symbol, shared by every session in the process. Stocks are never
+# deleted or renamed, so an entry only leaves when the cache is full.
+STOCK_ID_CACHE_SIZE = int(os.environ.get("STOCK_ID_CACHE_SIZE", "50000"))
+
+class StockIdCache:
+    def __init__(self, max_size=STOCK_ID_CACHE_SIZE):
+        self.max_size = max_size
+        self._ids = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get_many(self, symbols):
+        found = {}
+        with self._lock:
+            for symbol in symbols:
+                stock_id = self._ids.get(symbol)
+                if stock_id is not None:
+                    self._ids.move_to_end(symbol)
+                    found[symbol] = stock_id
+        return found
+
+    def update(self, stock_ids):
+        with self._lock:
+            for symbol, stock_id in stock_ids.items():
+                self._ids[symbol] = stock_id
+                self._ids.move_to_end(symbol)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+stock_id_cache = StockIdCache()
+
+# Ids a session looks up or creates reach the shared cache only once it commits,
+# so a rolled-back insert never leaves an id behind
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_stock_ids(session):
+    stock_ids = session.info.pop("stock_ids", None)
+    if stock_ids:
+        stock_id_cache.update(stock_ids)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_stock_ids(session):
+    session.info.pop("stock_ids", None)
+
+# Load the most recently added stocks into the id cache, once at start-up
+def warm_stock_id_cache():
+    with session_scope() as db:
+        rows = db.query(Stock.symbol, Stock.id).order_by(Stock.id.desc()).limit(stock_id_cache.max_size).all()
+    stock_id_cache.update(dict(reversed(rows)))
+    return len(rows)
+
+def _lookup_stock_ids(db, symbols):
+    stock_ids = stock_id_cache.get_many(symbols)
+    missing = [symbol for symbol in symbols if symbol not in stock_ids]
+    for chunk in _chunks(missing):
+        found = dict(db.query(Stock.symbol, Stock.id).filter(Stock.symbol.in_(chunk)).all())
+        stock_ids.update(found)
+        db.info.setdefault("stock_ids", {}).update(found)
+    return stock_ids
+
+# Get {symbol: stock id}, creating missing stocks in one statement with details
+# from the symbol master. New rows commit with the caller's unit of work.
+def _get_or_create_stock_ids(db, symbols):
+    symbols = list(dict.fromkeys(symbols))
+    stock_ids = _lookup_stock_ids(db, symbols)
+    missing = [symbol for symbol in symbols if symbol not in stock_ids]
+    if not missing:
+        return stock_ids
     
-    db.commit()
+    bare_symbols = {symbol: split_symbol(symbol) for symbol in missing}
+    masters = {}
+    for chunk in _chunks([bare for symbol, (bare, _) in bare_symbols.items() if bare != symbol]):
+        for master in db.query(Stock).filter(Stock.symbol.in_(chunk)):
+            masters[master.symbol] = master
     
-    # Add stocks to portfolio with sample holdings
-    portfolio_data = [
-        {"symbol": "AAPL", "quantity": 10, "average_price": 155.75},
-        {"symbol": "MSFT", "quantity": 5, "average_price": 285.30},
-        {"symbol": "GOOGL", "quantity": 3, "average_price": 125.50},
-        {"symbol": "NVDA", "quantity": 8, "average_price": 212.80},
+    rows = []
+    for symbol in missing:
+        bare_symbol, suffix = bare_symbols[symbol]
+        master = masters.get(bare_symbol) if bare_symbol != symbol else None
+        rows.append({
+            "symbol": symbol,
+            "company_name": master.company_name if master else symbol,
+            "sector": master.sector if master else None,
+            "industry": master.industry if master else None,
+            "exchange_suffix": suffix,
+            "isin": master.isin if master else None
+        })
+    # Another session may have created some of them in the meantime
+    db.execute(_dialect_insert(Stock.__table__).on_conflict_do_nothing(), rows)
+    stock_ids.update(_lookup_stock_ids(db, missing))
+    return stock_ids
+
+# Symbol master: bare ticker -> exchange suffix, ISIN and company name
+def get_symbol_master():
+    with session_scope() as db:
+        return db.query(
+            Stock.symbol, Stock.exchange_suffix, Stock.company_name, Stock.isin
+        ).all()
+
+def load_symbol_master(entries):
+    # entries is a list of dicts with symbol/company_name/exchange_suffix/isin keys
+    unique = {}
+    for entry in entries:
+        # Listed on more than one source, first one wins
+        unique.setdefault(entry["symbol"], entry)
+    entries = list(unique.values())
+    # Stocks created from user input (e.g. INFY.NS) also get the master's name and ISIN
+    symbols = [
+        f"{entry['symbol']}{suffix}" if suffix else entry["symbol"]
+        for entry in entries for suffix in ("", ".NS", ".BO")
     ]
     
-    for item in portfolio_data:
-        stock = db.query(Stock).filter(Stock.symbol == item["symbol"]).first()
-        if stock:
-            portfolio_item = PortfolioItem(
-                portfolio_id=default_portfolio.id,
-                stock_id=stock.id,
-                quantity=item["quantity"],
-                average_price=item["average_price"]
-            )
-            db.add(portfolio_item)
+    with session_scope() as db:
+        existing = {}
+        for chunk in _chunks(symbols):
+            for row in db.query(Stock.id, Stock.symbol, Stock.company_name, Stock.exchange_suffix, Stock.isin).filter(Stock.symbol.in_(chunk)):
+                existing[row.symbol] = row
+        
+        new_rows = []
+        updates = []
+        for entry in entries:
+            symbol = entry["symbol"]
+            if symbol not in existing:
+                new_rows.append({
+                    "symbol": symbol,
+                    "company_name": entry.get("company_name") or symbol,
+                    "exchange_suffix": entry.get("exchange_suffix"),
+                    "isin": entry.get("isin"),
+                    "last_updated": datetime.datetime.utcnow()
+                })
             
-            # Add a corresponding "buy" transaction
-            transaction = Transaction(
-                user_id=demo_user.id,
-                stock_id=stock.id,
-                transaction_type="Buy",
-                quantity=item["quantity"],
-                price=item["average_price"],
-                date=datetime.datetime.now() - datetime.timedelta(days=30)
-            )
-            db.add(transaction)
-    
-    db.commit()
-    
-    # Add user preferences
-    favorite_symbols = json.dumps(["AAPL", "MSFT", "GOOGL"])
-    chart_preferences = json.dumps({
-        "show_moving_averages": True,
-        "default_ma_periods": [20, 50],
-        "default_chart_type": "candlestick",
-        "show_volume": True
-    })
-    
-    user_prefs = UserPreference(
-        user_id=demo_user.id,
-        theme="light",
-        default_app="Stock Analysis",
-        favorite_symbols=favorite_symbols,
-        chart_preferences=chart_preferences
-    )
-    db.add(user_prefs)
-    
-    # Add sample alerts
-    alert_data = [
-        {"symbol": "AAPL", "alert_type": "Price Above", "value": 180.0},
-        {"symbol": "MSFT", "alert_type": "Price Below", "value": 260.0},
-        {"symbol": "TSLA", "alert_type": "% Change", "value": 5.0},
-    ]
-    
-    for alert_info in alert_data:
-        stock = db.query(Stock).filter(Stock.symbol == alert_info["symbol"]).first()
-        if stock:
-            alert = Alert(
-                user_id=demo_user.id,
-                stock_id=stock.id,
-                alert_type=alert_info["alert_type"],
-                value=alert_info["value"]
-            )
-            db.add(alert)
+            for stock in (existing.get(f"{symbol}{suffix}") for suffix in ("", ".NS", ".BO")):
+                if stock is None:
+                    continue
+                # Replace placeholder names and fill in missing master fields
+                changes = {}
+                placeholders = (None, stock.symbol, f"{stock.symbol} Inc.", symbol, f"{symbol} Inc.")
+                if entry.get("company_name") and stock.company_name in placeholders:
+                    changes["company_name"] = entry["company_name"]
+                if stock.symbol == symbol and stock.exchange_suffix is None and entry.get("exchange_suffix") is not None:
+                    changes["exchange_suffix"] = entry["exchange_suffix"]
+                if not stock.isin and entry.get("isin"):
+                    changes["isin"] = entry["isin"]
+                if changes:
+                    updates.append({"id": stock.id, **changes})
+        
+        if updates:
+            db.execute(update(Stock), updates)
+        if new_rows:
+            # Another session may have created some of them in the meantime
+            db.execute(_dialect_insert(Stock.__table__).on_conflict_do_nothing(), new_rows)
     
-    db.commit()
-    db.close()
+    return len(new_rows)
 
 # Database utility functions
 def get_user_watchlists(user_id):
-    db = get_db()
-    watchlists = db.query(Watchlist).filter(Watchlist.user_id == user_id).all()
-    db.close()
-    return watchlists
+    with session_scope() as db:
+        return db.query(Watchlist).filter(Watchlist.user_id == user_id).all()
+
+def create_watchlist(user_id, name="My Watchlist"):
+    with session_scope() as db:
+        watchlist = Watchlist(name=name, user_id=user_id)
+        db.add(watchlist)
+    return watchlist
 
 def get_watchlist_stocks(watchlist_id):
-    db = get_db()
-    items = db.query(
-        Stock
-    ).join(
-        WatchlistItem, WatchlistItem.stock_id == Stock.id
-    ).filter(
-        WatchlistItem.watchlist_id == watchlist_id
-    ).all()
-    db.close()
-    return items
+    with session_scope() as db:
+        return db.query(
+            Stock
+        ).join(
+            WatchlistItem, WatchlistItem.stock_id == Stock.id
+        ).filter(
+            WatchlistItem.watchlist_id == watchlist_id
+        ).all()
 
 def get_user_portfolios(user_id):
-    db = get_db()
-    portfolios = db.query(Portfolio).filter(Portfolio.user_id == user_id).all()
-    db.close()
-    return portfolios
+    with session_scope() as db:
+        return db.query(Portfolio).filter(Portfolio.user_id == user_id).all()
 
 def get_portfolio_items(portfolio_id):
-    db = get_db()
-    items = db.query(
-        Stock, PortfolioItem.quantity, PortfolioItem.average_price
-    ).join(
-        PortfolioItem, PortfolioItem.stock_id == Stock.id
-    ).filter(
-        PortfolioItem.portfolio_id == portfolio_id
-    ).all()
-    db.close()
-    return items
+    with session_scope() as db:
+        return db.query(
+            Stock, PortfolioItem.quantity, PortfolioItem.average_price
+        ).join(
+            PortfolioItem, PortfolioItem.stock_id == Stock.id
+        ).filter(
+            PortfolioItem.portfolio_id == portfolio_id
+        ).all()
 
 def get_user_transactions(user_id, limit=20):
-    db = get_db()
-    transactions = db.query(
-        Transaction, Stock.symbol
-    ).join(
-        Stock, Transaction.stock_id == Stock.id
-    ).filter(
-        Transaction.user_id == user_id
-    ).order_by(
-        Transaction.date.desc()
-    ).limit(limit).all()
-    db.close()
-    return transactions
+    with session_scope() as db:
+        return db.query(
+            Transaction, Stock.symbol
+        ).join(
+            Stock, Transaction.stock_id == Stock.id
+        ).filter(
+            Transaction.user_id == user_id
+        ).order_by(
+            Transaction.date.desc()
+        ).limit(limit).all()
 
 def get_user_alerts(user_id):
-    db = get_db()
-    alerts = db.query(
-        Alert, Stock.symbol
-    ).join(
-        Stock, Alert.stock_id == Stock.id
-    ).filter(
-        Alert.user_id == user_id, 
-        Alert.active == True
-    ).all()
-    db.close()
-    return alerts
+    with session_scope() as db:
+        return db.query(
+            Alert, Stock.symbol
+        ).join(
+            Stock, Alert.stock_id == Stock.id
+        ).filter(
+            Alert.user_id == user_id, 
+            Alert.active == True
+        ).all()
+
+def _add_stocks_to_watchlist(db, watchlist_id, symbols):
+    stock_ids = _get_or_create_stock_ids(db, symbols)
+    present = {row[0] for row in db.query(WatchlistItem.stock_id).filter(WatchlistItem.watchlist_id == watchlist_id)}
+    new_ids = [stock_id for stock_id in dict.fromkeys(stock_ids.values()) if stock_id not in present]
+    if new_ids:
+        db.execute(
+            _dialect_insert(WatchlistItem.__table__).on_conflict_do_nothing(),
+            [{"watchlist_id": watchlist_id, "stock_id": stock_id} for stock_id in new_ids]
+        )
+    return len(new_ids)
+
+# Add many symbols to a watchlist at once; returns how many were not already on it
+def add_stocks_to_watchlist(watchlist_id, symbols):
+    with session_scope() as db:
+        return _add_stocks_to_watchlist(db, watchlist_id, symbols)
 
 def add_stock_to_watchlist(watchlist_id, symbol):
-    db = get_db()
-    
-    # Check if stock exists
-    stock = db.query(Stock).filter(Stock.symbol == symbol).first()
-    if not stock:
-        # If not, create it
-        stock = Stock(symbol=symbol, company_name=f"{symbol} Inc.")
-        db.add(stock)
-        db.commit()
-        db.refresh(stock)
-    
-    # Check if stock is already in watchlist
-    existing = db.query(WatchlistItem).filter(
-        WatchlistItem.watchlist_id == watchlist_id,
-        WatchlistItem.stock_id == stock.id
-    ).first()
-    
-    if not existing:
-        item = WatchlistItem(watchlist_id=watchlist_id, stock_id=stock.id)
-        db.add(item)
-        db.commit()
-        result = True
-    else:
-        result = False
-    
-    db.close()
-    return result
+    return add_stocks_to_watchlist(watchlist_id, [symbol]) == 1
 
 def remove_stock_from_watchlist(watchlist_id, symbol):
-    db = get_db()
-    
-    stock = db.query(Stock).filter(Stock.symbol == symbol).first()
-    if stock:
+    with session_scope() as db:
+        stock_id = _lookup_stock_ids(db, [symbol]).get(symbol)
+        if stock_id is None:
+            return False
+        
         item = db.query(WatchlistItem).filter(
             WatchlistItem.watchlist_id == watchlist_id,
-            WatchlistItem.stock_id == stock.id
+            WatchlistItem.stock_id == stock_id
         ).first()
         
-        if item:
-            db.delete(item)
-            db.commit()
-            result = True
-        else:
-            result = False
-    else:
-        result = False
-    
-    db.close()
-    return result
+        if not item:
+            return False
+        
+        db.delete(item)
+        return True
 
-def add_stock_transaction(user_id, symbol, transaction_type, quantity, price):
-    db = get_db()
+TRANSACTION_TYPES = ("Buy", "Sell")
+
+# Fold one trade into a holding of (quantity, average price); None means not held.
+# Buys re-average the price, sells only reduce the quantity.
+def _apply_trade(holding, transaction_type, quantity, price):
+    if transaction_type == "Buy":
+        if holding is None:
+            return (quantity, price)
+        held_quantity, average_price = holding
+        new_quantity = held_quantity + quantity
+        return (new_quantity, (held_quantity * average_price + quantity * price) / new_quantity)
     
-    # Get or create stock
-    stock = db.query(Stock).filter(Stock.symbol == symbol).first()
-    if not stock:
-        stock = Stock(symbol=symbol, company_name=f"{symbol} Inc.")
-        db.add(stock)
-        db.commit()
-        db.refresh(stock)
-    
-    # Add transaction
-    transaction = Transaction(
-        user_id=user_id,
-        stock_id=stock.id,
-        transaction_type=transaction_type,
-        quantity=quantity,
-        price=price
-    )
-    db.add(transaction)
-    db.commit()
+    if holding is None:
+        return None
+    remaining = holding[0] - quantity
+    return (remaining, holding[1]) if remaining > 0 else None
+
+# Function to read a trade quantity or price, which must be a finite number above zero
+def _positive_number(value, field):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = float("nan")
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"Invalid {field}: {value}")
+    return number
+
+def _import_transactions(db, user_id, rows):
+    for row in rows:
+        if row["transaction_type"] not in TRANSACTION_TYPES:
+            raise ValueError(f"Unknown transaction type: {row['transaction_type']}")
+        _positive_number(row["quantity"], "quantity")
+        _positive_number(row["price"], "price")
+    if not rows:
+        return 0
     
-    # Update portfolio
-    # Get default portfolio
-    portfolio = db.query(Portfolio).filter(Portfolio.user_id == user_id).first()
+    # Lock the portfolio first, so trades for one user are applied one unit of work at a time
+    portfolio_query = db.query(Portfolio).filter(Portfolio.user_id == user_id).order_by(Portfolio.id).with_for_update()
+    portfolio = portfolio_query.first()
     if not portfolio:
-        portfolio = Portfolio(name="My Portfolio", user_id=user_id)
-        db.add(portfolio)
-        db.commit()
-        db.refresh(portfolio)
+        # Concurrent first trades all insert the default portfolio; the unique
+        # (user_id, name) index keeps one, and every trade then locks that one
+        db.execute(_dialect_insert(Portfolio.__table__).on_conflict_do_nothing(), [
+            {"name": "My Portfolio", "user_id": user_id, "created_at": datetime.datetime.utcnow()}
+        ])
+        portfolio = portfolio_query.first()
     
-    # Check if stock is already in portfolio
-    portfolio_item = db.query(PortfolioItem).filter(
-        PortfolioItem.portfolio_id == portfolio.id,
-        PortfolioItem.stock_id == stock.id
-    ).first()
+    now = datetime.datetime.utcnow()
+    stock_ids = _get_or_create_stock_ids(db, [row["symbol"] for row in rows])
+    trades = sorted((
+        {
+            "user_id": user_id,
+            "stock_id": stock_ids[row["symbol"]],
+            "transaction_type": row["transaction_type"],
+            "quantity": float(row["quantity"]),
+            "price": float(row["price"]),
+            "date": row.get("date") or now
+        }
+        for row in rows
+    ), key=lambda trade: trade["date"])
+    db.execute(Transaction.__table__.insert(), trades)
     
-    if transaction_type == "Buy":
-        if not portfolio_item:
-            # Add new portfolio item
-            portfolio_item = PortfolioItem(
-                portfolio_id=portfolio.id,
-                stock_id=stock.id,
-                quantity=quantity,
-                average_price=price
-            )
-            db.add(portfolio_item)
-        else:
-            # Update existing item with weighted average price
-            total_value = (portfolio_item.quantity * portfolio_item.average_price) + (quantity * price)
-            new_quantity = portfolio_item.quantity + quantity
-            portfolio_item.average_price = total_value / new_quantity
-            portfolio_item.quantity = new_quantity
-    elif transaction_type == "Sell":
-        if portfolio_item:
-            # Reduce quantity
-            portfolio_item.quantity -= quantity
-            
-            # Remove item if quantity becomes zero or negative
-            if portfolio_item.quantity <= 0:
-                db.delete(portfolio_item)
+    # Replay the trades, oldest first, over the current holdings of the stocks they touch
+    touched = list(dict.fromkeys(trade["stock_id"] for trade in trades))
+    holdings = {}
+    for chunk in _chunks(touched):
+        for stock_id, quantity, average_price in db.query(
+            PortfolioItem.stock_id, PortfolioItem.quantity, PortfolioItem.average_price
+        ).filter(
+            PortfolioItem.portfolio_id == portfolio.id,
+            PortfolioItem.stock_id.in_(chunk)
+        ).with_for_update():
+            holdings[stock_id] = (quantity, average_price)
+    held_before = set(holdings)
     
-    db.commit()
-    db.close()
+    for trade in trades:
+        holdings[trade["stock_id"]] = _apply_trade(holdings.get(trade["stock_id"]), trade["transaction_type"], trade["quantity"], trade["price"])
+    
+    upserts = [
+        {"portfolio_id": portfolio.id, "stock_id": stock_id, "quantity": holding[0], "average_price": holding[1]}
+        for stock_id, holding in holdings.items() if holding is not None
+    ]
+    if upserts:
+        insert = _dialect_insert(PortfolioItem.__table__)
+        db.execute(insert.on_conflict_do_update(
+            index_elements=["portfolio_id", "stock_id"],
+            set_={"quantity": insert.excluded.quantity, "average_price": insert.excluded.average_price}
+        ), upserts)
+    
+    # Remove items whose quantity reached zero
+    sold_out = [stock_id for stock_id, holding in holdings.items() if holding is None and stock_id in held_before]
+    for chunk in _chunks(sold_out):
+        db.query(PortfolioItem).filter(
+            PortfolioItem.portfolio_id == portfolio.id,
+            PortfolioItem.stock_id.in_(chunk)
+        ).delete(synchronize_session=False)
+    
+    return len(trades)
+
+# Record many trades at once (e.g. a broker statement) and update the default
+# portfolio, all in one transaction. rows are dicts with symbol/transaction_type/
+# quantity/price keys and an optional date; returns the number of trades recorded.
+def import_transactions(user_id, rows):
+    with session_scope(lock_for_write=True) as db:
+        return _import_transactions(db, user_id, rows)
+
+def add_stock_transaction(user_id, symbol, transaction_type, quantity, price):
+    import_transactions(user_id, [{
+        "symbol": symbol,
+        "transaction_type": transaction_type,
+        "quantity": quantity,
+        "price": price
+    }])
     return True
 
 def get_or_create_user(username, email):
     try:
-        db = get_db()
-        
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            user = User(username=username, email=email)
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+        with session_scope() as db:
+            user = db.query(User).filter(User.username == username).first()
+            if not user:
+                user = User(username=username, email=email)
+                db.add(user)
+                db.flush()
         
-        db.close()
         return user
     except Exception as e:
         print(f"Error in get_or_create_user: {e}")
@@ -484,35 +841,18 @@ def get_or_create_user(username, email):
 
 def get_user_preferences(user_id):
     try:
-        db = get_db()
-        
-        prefs = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
-        if not prefs:
-            # Create default preferences
-            favorite_symbols = json.dumps(["AAPL", "MSFT", "GOOGL"])
-            chart_preferences = json.dumps({
-                "show_moving_averages": True,
-                "default_ma_periods": [20, 50],
-                "default_chart_type": "candlestick",
-                "show_volume": True
-            })
-            
-            prefs = UserPreference(
-                user_id=user_id,
-                theme="light",
-                default_app="Stock Analysis",
-                favorite_symbols=favorite_symbols,
-                chart_preferences=chart_preferences
-            )
-            
-            try:
-                db.add(prefs)
-                db.commit()
-                db.refresh(prefs)
-            except Exception as e:
-                print(f"Error saving preferences: {e}")
-                db.rollback()
-                # Create a dummy preference object
+        with session_scope() as db:
+            prefs = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+            if not prefs:
+                # Create default preferences
+                favorite_symbols = json.dumps(["AAPL", "MSFT", "GOOGL"])
+                chart_preferences = json.dumps({
+                    "show_moving_averages": True,
+                    "default_ma_periods": [20, 50],
+                    "default_chart_type": "candlestick",
+                    "show_volume": True
+                })
+                
                 prefs = UserPreference(
                     user_id=user_id,
                     theme="light",
@@ -520,6 +860,21 @@ def get_user_preferences(user_id):
                     favorite_symbols=favorite_symbols,
                     chart_preferences=chart_preferences
                 )
+                
+                try:
+                    db.add(prefs)
+                    db.flush()
+                except Exception as e:
+                    print(f"Error saving preferences: {e}")
+                    db.rollback()
+                    # Create a dummy preference object
+                    prefs = UserPreference(
+                        user_id=user_id,
+                        theme="light",
+                        default_app="Stock Analysis",
+                        favorite_symbols=favorite_symbols,
+                        chart_preferences=chart_preferences
+                    )
         
         # Parse JSON fields
         favorite_symbols_list = []
@@ -550,7 +905,6 @@ def get_user_preferences(user_id):
         prefs.favorite_symbols_list = favorite_symbols_list
         prefs.chart_preferences_dict = chart_preferences_dict
         
-        db.close()
         return prefs
     except Exception as e:
         print(f"Error in get_user_preferences: {e}")
@@ -571,70 +925,113 @@ def get_user_preferences(user_id):
         return dummy_prefs
 
 def update_user_preferences(user_id, theme=None, default_app=None, favorite_symbols=None, chart_preferences=None):
-    db = get_db()
-    
-    prefs = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
-    if not prefs:
-        # Create default preferences first
-        prefs = UserPreference(user_id=user_id)
-        db.add(prefs)
-    
-    if theme:
-        prefs.theme = theme
-    
-    if default_app:
-        prefs.default_app = default_app
-    
-    if favorite_symbols:
-        prefs.favorite_symbols = json.dumps(favorite_symbols)
-    
-    if chart_preferences:
-        prefs.chart_preferences = json.dumps(chart_preferences)
+    with session_scope() as db:
+        prefs = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+        if not prefs:
+            # Create default preferences first
+            prefs = UserPreference(user_id=user_id)
+            db.add(prefs)
+        
+        if theme:
+            prefs.theme = theme
+        
+        if default_app:
+            prefs.default_app = default_app
+        
+        if favorite_symbols:
+            prefs.favorite_symbols = json.dumps(favorite_symbols)
+        
+        if chart_preferences:
+            prefs.chart_preferences = json.dumps(chart_preferences)
     
-    db.commit()
-    db.close()
     return True
 
 def add_alert(user_id, symbol, alert_type, value):
-    db = get_db()
+    with session_scope() as db:
+        # Get or create stock
+        stock_id = _get_or_create_stock_ids(db, [symbol])[symbol]
+        
+        # Add alert
+        alert = Alert(
+            user_id=user_id,
+            stock_id=stock_id,
+            alert_type=alert_type,
+            value=value
+        )
+        db.add(alert)
     
-    # Get or create stock
-    stock = db.query(Stock).filter(Stock.symbol == symbol).first()
-    if not stock:
-        stock = Stock(symbol=symbol, company_name=f"{symbol} Inc.")
-        db.add(stock)
-        db.commit()
-        db.refresh(stock)
-    
-    # Add alert
-    alert = Alert(
-        user_id=user_id,
-        stock_id=stock.id,
-        alert_type=alert_type,
-        value=value
-    )
-    db.add(alert)
-    db.commit()
-    db.close()
     return True
 
 def delete_alert(alert_id):
-    db = get_db()
-    
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
-    if alert:
+    with session_scope() as db:
+        alert = db.query(Alert).filter(Alert.id == alert_id).first()
+        if not alert:
+            return False
+        
         db.delete(alert)
-        db.commit()
-        result = True
-    else:
-        result = False
+        return True
+
+# Symbols someone is watching, holding or has an active alert on, across all users
+def get_tracked_symbols():
+    with session_scope() as db:
+        watched = db.query(Stock.symbol).join(WatchlistItem, WatchlistItem.stock_id == Stock.id)
+        held = db.query(Stock.symbol).join(PortfolioItem, PortfolioItem.stock_id == Stock.id)
+        alerted = db.query(Stock.symbol).join(Alert, Alert.stock_id == Stock.id).filter(Alert.active == True)
+        return [row[0] for row in watched.union(held, alerted).all()]
+
+# Price history store
+def get_price_history_bounds(symbol):
+    with session_scope() as db:
+        bounds = db.query(
+            func.min(PriceHistory.date), func.max(PriceHistory.date)
+        ).filter(
+            PriceHistory.symbol == symbol
+        ).first()
+    return bounds if bounds else (None, None)
+
+def get_price_history(symbol, start_date=None, end_date=None):
+    with session_scope() as db:
+        query = db.query(
+            PriceHistory.date,
+            PriceHistory.open,
+            PriceHistory.high,
+            PriceHistory.low,
+            PriceHistory.close,
+            PriceHistory.volume
+        ).filter(
+            PriceHistory.symbol == symbol
+        )
+        if start_date:
+            query = query.filter(PriceHistory.date >= start_date)
+        if end_date:
+            query = query.filter(PriceHistory.date < end_date)
+        return query.order_by(PriceHistory.date).all()
+
+def save_price_history(symbol, bars):
+    # bars is a list of dicts with date/open/high/low/close/volume keys
+    if not bars:
+        return 0
+    
+    with session_scope() as db:
+        # Replace any overlapping bars so re-fetched days never duplicate
+        dates = [bar["date"] for bar in bars]
+        db.query(PriceHistory).filter(
+            PriceHistory.symbol == symbol,
+            PriceHistory.date >= min(dates),
+            PriceHistory.date <= max(dates)
+        ).delete(synchronize_session=False)
+        
+        db.execute(
+            PriceHistory.__table__.insert(),
+            [dict(bar, symbol=symbol) for bar in bars]
+        )
     
-    db.close()
-    return result
+    return len(bars)
 
 # Initialize database
 def init_db():
     create_tables()
+    migrate_schema()
     initialize_demo_data()
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+import gzip
+import io
+import zipfile
+
+# Rows written per chunk, so a large frame is never held as one CSV string
+EXPORT_CHUNK_ROWS = 10000
+
+# Format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Function to write a frame as CSV text into a binary file object, chunk by chunk
+def write_csv(data, fileobj, index=True):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    for start in range(0, max(len(data), 1), EXPORT_CHUNK_ROWS):
+        data.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(text, index=index, header=start == 0)
+    text.flush()
+    # Leave fileobj open for the caller
+    text.detach()
+
+# Function to write a frame as Parquet, one row group per chunk
+def write_parquet(data, fileobj, index=True):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for start in range(0, max(len(data), 1), EXPORT_CHUNK_ROWS):
+        table = pa.Table.from_pandas(data.iloc[start:start + EXPORT_CHUNK_ROWS], preserve_index=index)
+        if writer is None:
+            writer = pq.ParquetWriter(fileobj, table.schema, compression="snappy")
+        writer.write_table(table)
+    writer.close()
+
+def _write(data, fileobj, export_format, index):
+    if export_format == "CSV":
+        write_csv(data, fileobj, index)
+    elif export_format == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=fileobj, mode="wb") as compressed:
+            write_csv(data, compressed, index)
+    elif export_format == "Parquet":
+        write_parquet(data, fileobj, index)
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+# Function to build a download file for one frame; returns (bytes, file name, MIME type)
+def export_frame(data, base_name, export_format, index=True):
+    extension, mime = EXPORT_FORMATS[export_format]
+    buffer = io.BytesIO()
+    _write(data, buffer, export_format, index)
+    return buffer.getvalue(), f"{base_name}.{extension}", mime
+
+# Function to build a zip with one file per frame, loading each frame only when
+# it is written. frames is an iterable of (name, frame or callable returning a frame).
+def export_bundle(frames, base_name, export_format, index=True):
+    extension, _ = EXPORT_FORMATS[export_format]
+    buffer = io.BytesIO()
+    # CSV is deflated by the zip itself; gzip and Parquet are already compressed
+    compression = zipfile.ZIP_DEFLATED if export_format == "CSV" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(buffer, "w", compression=compression) as bundle:
+        for name, data in frames:
+            data = data() if callable(data) else data
+            if data is None or data.empty:
+                continue
+            with bundle.open(f"{name}.{extension}", "w") as member:
+                _write(data, member, export_format, index)
+    return buffer.getvalue(), f"{base_name}.zip", "application/zip"
@@ -0,0 +1,222 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATOR_CACHE_SIZE = 128  # computed frames kept, least recently used dropped first
+
+# Function to compute a simple moving average with one cumulative sum:
+# mean of window n ending at i = (csum[i + 1] - csum[i + 1 - n]) / n
+def _rolling_mean(values, window):
+    result = np.full(len(values), np.nan)
+    if window <= 0 or window > len(values):
+        return result
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    result[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return result
+
+# Function to compute several moving averages of a price series into a new frame
+def compute_moving_averages(close, windows):
+    values = close.to_numpy(dtype=np.float64)
+    columns = {}
+    if np.isnan(values).any():
+        # A gap would poison every later cumulative sum; let pandas skip it per window
+        for window in windows:
+            columns[f"MA_{window}"] = close.rolling(window=window).mean().to_numpy()
+    else:
+        for window in windows:
+            columns[f"MA_{window}"] = _rolling_mean(values, window)
+    return pd.DataFrame(columns, index=close.index)
+
+# Function to compute a rolling population standard deviation from cumulative
+# sums of x and x^2, shifted by the first value to keep the sums small
+def _rolling_std(values, window):
+    centered = values - values[0] if len(values) else values
+    mean = _rolling_mean(centered, window)
+    mean_sq = _rolling_mean(centered * centered, window)
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+def _rolling_max(values, window):
+    result = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        result[window - 1:] = sliding_window_view(values, window).max(axis=1)
+    return result
+
+def _rolling_min(values, window):
+    result = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        result[window - 1:] = sliding_window_view(values, window).min(axis=1)
+    return result
+
+# Exponential smoothing is recursive, so it runs in pandas' compiled ewm
+def _ema(values, span=None, alpha=None):
+    return pd.Series(values).ewm(span=span, alpha=alpha, adjust=False).mean().to_numpy()
+
+def _shift(values, periods):
+    result = np.full(len(values), np.nan)
+    if 0 <= periods < len(values):
+        result[periods:] = values[:len(values) - periods]
+    elif -len(values) < periods < 0:
+        result[:periods] = values[-periods:]
+    return result
+
+# Function to compute the Relative Strength Index with Wilder's smoothing
+def rsi(close, period=14):
+    change = np.diff(close, prepend=close[0])
+    average_gain = _ema(np.maximum(change, 0), alpha=1 / period)
+    average_loss = _ema(np.maximum(-change, 0), alpha=1 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - 100 / (1 + average_gain / average_loss)
+    values[average_loss == 0] = 100.0
+    values[:period] = np.nan
+    return {"RSI": values}
+
+def macd(close, fast=12, slow=26, signal=9):
+    line = _ema(close, span=fast) - _ema(close, span=slow)
+    signal_line = _ema(line, span=signal)
+    return {"MACD": line, "MACD_Signal": signal_line, "MACD_Hist": line - signal_line}
+
+def bollinger_bands(close, window=20, num_std=2):
+    middle = _rolling_mean(close, window)
+    width = num_std * _rolling_std(close, window)
+    return {"BB_Middle": middle, "BB_Upper": middle + width, "BB_Lower": middle - width}
+
+def stochastic(high, low, close, k_period=14, d_period=3):
+    highest = _rolling_max(high, k_period)
+    lowest = _rolling_min(low, k_period)
+    price_range = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # A flat window has no range; put %K in the middle
+        k = np.where(price_range > 0, 100 * (close - lowest) / price_range, 50.0)
+    k[:k_period - 1] = np.nan
+    d = np.full(len(k), np.nan)
+    d[k_period - 1:] = _rolling_mean(k[k_period - 1:], d_period)
+    return {"Stoch_K": k, "Stoch_D": d}
+
+# Function to compute the Average Directional Index and its +DI/-DI lines
+def adx(high, low, close, period=14):
+    up_move = np.diff(high, prepend=high[0])
+    down_move = -np.diff(low, prepend=low[0])
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    previous_close = _shift(close, 1)
+    previous_close[0] = close[0]
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+    atr = _ema(true_range, alpha=1 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100 * _ema(plus_dm, alpha=1 / period) / atr
+        minus_di = 100 * _ema(minus_dm, alpha=1 / period) / atr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    values = _ema(np.nan_to_num(dx), alpha=1 / period)
+    values[:2 * period] = np.nan
+    return {"ADX": values, "Plus_DI": plus_di, "Minus_DI": minus_di}
+
+# Function to compute the Ichimoku lines. The leading spans are plotted on the
+# bar they belong to (computed 26 bars earlier), so they stay on the data's index.
+def ichimoku(high, low, close, conversion=9, base=26, span_b=52):
+    tenkan = (_rolling_max(high, conversion) + _rolling_min(low, conversion)) / 2
+    kijun = (_rolling_max(high, base) + _rolling_min(low, base)) / 2
+    senkou_b = (_rolling_max(high, span_b) + _rolling_min(low, span_b)) / 2
+    return {
+        "Ichimoku_Tenkan": tenkan,
+        "Ichimoku_Kijun": kijun,
+        "Ichimoku_Senkou_A": _shift((tenkan + kijun) / 2, base),
+        "Ichimoku_Senkou_B": _shift(senkou_b, base),
+        "Ichimoku_Chikou": _shift(close, -base),
+    }
+
+# Function to compute On-Balance Volume
+def obv(close, volume):
+    direction = np.sign(np.diff(close, prepend=close[0]))
+    return {"OBV": np.cumsum(direction * volume)}
+
+# Indicator name -> function of the OHLCV arrays. Overlays share the price
+# axis; the others are drawn in their own panel.
+INDICATORS = {
+    "RSI": lambda bars: rsi(bars["Close"]),
+    "MACD": lambda bars: macd(bars["Close"]),
+    "Bollinger Bands": lambda bars: bollinger_bands(bars["Close"]),
+    "Stochastic": lambda bars: stochastic(bars["High"], bars["Low"], bars["Close"]),
+    "ADX": lambda bars: adx(bars["High"], bars["Low"], bars["Close"]),
+    "Ichimoku": lambda bars: ichimoku(bars["High"], bars["Low"], bars["Close"]),
+    "OBV": lambda bars: obv(bars["Close"], bars["Volume"]),
+}
+OVERLAY_INDICATORS = ["Bollinger Bands", "Ichimoku"]
+
+# Function to compute the named indicators over an OHLCV frame into a new frame
+def compute_indicators(data, names):
+    bars = {column: data[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close", "Volume")}
+    columns = {}
+    for name in names:
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        if len(data):
+            columns.update(INDICATORS[name](bars))
+    return pd.DataFrame(columns, index=data.index)
+
+# Small thread-safe LRU, used for computed indicator frames and chart figures
+class LRUCache:
+    def __init__(self, max_size=INDICATOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Cached value for key, or None
+    def get(self, key):
+        with self._lock:
+            if key not in self._frames:
+                return None
+            self._frames.move_to_end(key)
+            return self._frames[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._frames[key] = value
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_size:
+                self._frames.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+
+        frame = compute()
+        self.set(key, frame)
+        return frame
+
+indicator_cache = LRUCache()
+
+# Key for a price frame: new bars or a changed last close give a new key
+def data_key(data):
+    if data.empty:
+        return (0,)
+    return (len(data), data.index[0], data.index[-1], float(data["Close"].iloc[-1]))
+
+# Function to get MA_{n} columns for a symbol's price data, computed once per
+# (symbol, window set) into a separate frame so data is never modified.
+# The returned frame is shared between callers; copy it before changing it.
+def get_moving_averages(symbol, data, windows):
+    windows = tuple(sorted(set(int(window) for window in windows or ())))
+    if not windows:
+        return pd.DataFrame(index=data.index)
+
+    return indicator_cache.get_or_compute(
+        ("ma", symbol, windows) + data_key(data),
+        lambda: compute_moving_averages(data["Close"], windows)
+    )
+
+# Function to get indicator columns (see INDICATORS) for a symbol's price data,
+# memoised like get_moving_averages. Alerts and screens can read the last row.
+def get_indicators(symbol, data, names):
+    names = tuple(name for name in INDICATORS if name in set(names or ()))
+    if not names:
+        return pd.DataFrame(index=data.index)
+
+    return indicator_cache.get_or_compute(
+        ("indicators", symbol, names) + data_key(data),
+        lambda: compute_indicators(data, names)
+    )
@@ -1,6 +1,9 @@
 from database import init_db
+from market_data import refresh_symbol_master
 
 if __name__ == "__main__":
     print("Initializing database...")
     init_db()
+    print("Loading symbol master...")
+    print(f"Added {refresh_symbol_master()} symbols")
     print("Database initialization complete!")
\ No newline at end of file
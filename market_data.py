@@ -0,0 +1,667 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+import database as db
+from indicators import LRUCache
+from providers import ACTION_COLUMNS, PERIOD_DAYS, PRICE_COLUMNS, create_providers, pick_index_quote
+from resilience import TTLCache, UpstreamError, call_upstream, schedule_refresh, single_flight
+
+# Price and NSE data sources, chosen by MARKET_DATA_PROVIDER (see providers.py)
+prices, nse = create_providers()
+
+# Symbols whose listing starts after the earliest window requested so far,
+# so we do not try to backfill them on every request
+_history_floor = {}
+# Latest split or dividend the stored bars of each symbol are adjusted for
+_adjusted_through = {}
+_store_lock = threading.Lock()
+_store_ready = False
+
+# Widest history window loaded per symbol, shared by every period and page.
+# {query_ticker: (start_date, end_date, loaded_at, frame)}, least recently used dropped first
+HISTORY_WINDOW_TTL = 3600  # seconds
+HISTORY_WINDOW_CACHE_SIZE = 256
+_history_windows = LRUCache(max_size=HISTORY_WINDOW_CACHE_SIZE)
+
+# Make sure the price history table exists before the first read
+def _ensure_store():
+    global _store_ready
+    if _store_ready:
+        return
+    with _store_lock:
+        if not _store_ready:
+            db.PriceHistory.__table__.create(bind=db.engine, checkfirst=True)
+            _store_ready = True
+
+# Function to fetch bars for one symbol, raising UpstreamError if the provider is failing
+def _fetch_history(query_ticker, **kwargs):
+    return call_upstream(prices.name, prices.history, query_ticker, **kwargs)
+
+# Function to download daily bars as a flat OHLCV frame, with ACTION_COLUMNS if actions is set
+def download_history(query_ticker, start_date, end_date, actions=False):
+    return single_flight.do(
+        ("download", query_ticker, str(start_date), str(end_date), actions),
+        _fetch_history, query_ticker, start=start_date, end=end_date, actions=actions
+    )
+
+# Date of the latest split or dividend in a frame with ACTION_COLUMNS, or None
+def _last_action_date(data):
+    actions = data.reindex(columns=ACTION_COLUMNS).fillna(0).to_numpy()
+    dates = data.index[(actions != 0).any(axis=1)]
+    return dates[-1] if len(dates) else None
+
+def _frame_to_bars(data):
+    bars = []
+    for date, row in data.iterrows():
+        bars.append({
+            "date": pd.Timestamp(date).to_pydatetime().replace(tzinfo=None),
+            "open": float(row["Open"]),
+            "high": float(row["High"]),
+            "low": float(row["Low"]),
+            "close": float(row["Close"]),
+            "volume": float(row["Volume"]),
+        })
+    return bars
+
+def _bars_to_frame(rows):
+    data = pd.DataFrame(rows, columns=["Date"] + PRICE_COLUMNS)
+    data["Date"] = pd.to_datetime(data["Date"])
+    return data.set_index("Date")
+
+# Function to get daily bars from start_date through end_date (both days included)
+# from the local store, fetching only missing bars. Today's bar may still be
+# forming, so it is downloaded with the delta and returned but never stored.
+def get_price_history(query_ticker, start_date, end_date):
+    # Daily bars are stored at midnight, so compare on whole days
+    start_date = datetime(start_date.year, start_date.month, start_date.day)
+    end_date = datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1)
+
+    # Sessions opening the same chart at once share one store update
+    return single_flight.do(
+        ("history", query_ticker, start_date, end_date),
+        _load_price_history, query_ticker, start_date, end_date
+    )
+
+# Split a downloaded frame into bars before today, which are stored, and today's bar
+def _split_session(data):
+    today = pd.Timestamp(datetime.today().date())
+    return data[data.index < today], data[data.index >= today]
+
+# end_date is exclusive here
+def _load_price_history(query_ticker, start_date, end_date):
+    try:
+        _ensure_store()
+        first_date, last_date = db.get_price_history_bounds(query_ticker)
+    except Exception as e:
+        # Store unavailable, fall back to a plain download
+        print(f"Price history store unavailable: {e}")
+        return download_history(query_ticker, start_date, end_date)
+
+    current = None
+    if first_date is None:
+        # Nothing stored yet, download the full window once
+        fetched = download_history(query_ticker, start_date, end_date)
+        closed, current = _split_session(fetched)
+        db.save_price_history(query_ticker, _frame_to_bars(closed))
+        if fetched.empty:
+            return fetched
+        _history_floor[query_ticker] = start_date
+    else:
+        try:
+            # Backfill if the requested window starts well before what we have
+            # (a few days of slack covers weekends and exchange holidays)
+            floor = _history_floor.get(query_ticker)
+            if start_date < first_date - timedelta(days=5) and (floor is None or start_date < floor):
+                backfill = download_history(query_ticker, start_date, first_date)
+                db.save_price_history(query_ticker, _frame_to_bars(backfill))
+                _history_floor[query_ticker] = start_date
+
+            # Append the bars after the last stored date, and replace that one too:
+            # "today" is the server's date, so on a server ahead of the exchange the
+            # last bar may have been stored while its session was still trading
+            if last_date < end_date:
+                delta = download_history(query_ticker, last_date, end_date, actions=True)
+                action_date = _last_action_date(delta)
+                if action_date is not None and action_date > _adjusted_through.get(query_ticker, pd.Timestamp.min):
+                    # Bars are adjusted back from every split and dividend, so a new
+                    # one moves all the stored bars: download them again on the new basis
+                    print(f"Reloading price history for {query_ticker} after a corporate action on {action_date.date()}")
+                    delta = download_history(query_ticker, first_date, end_date)
+                    _adjusted_through[query_ticker] = action_date
+                closed, current = _split_session(delta)
+                db.save_price_history(query_ticker, _frame_to_bars(closed))
+        except UpstreamError as e:
+            # Serve the bars we already have; the next request tries again
+            print(f"Serving stored history for {query_ticker}: {e}")
+
+    rows = db.get_price_history(query_ticker, start_date, end_date)
+    data = _bars_to_frame(rows)
+    if current is not None and not current.empty:
+        data = pd.concat([data[data.index < current.index[0]], current[PRICE_COLUMNS]])
+    return data
+
+# Function to get the last `days` of bars for a symbol from the shared window cache
+def get_history_window(query_ticker, days):
+    end_date = datetime.today()
+    start_date = end_date - timedelta(days=days)
+    today = end_date.date()
+
+    cached = _history_windows.get(query_ticker)
+    if cached is not None:
+        cached_start, cached_end, loaded_at, frame = cached
+        # Keep the window at least as wide as anything served before
+        window_start = min(start_date, datetime.combine(cached_start, datetime.min.time()))
+        if cached_start <= start_date.date():
+            fresh = cached_end == today and (end_date - loaded_at).total_seconds() < HISTORY_WINDOW_TTL
+            if not fresh:
+                # Serve the stale window now and refresh it in the background
+                schedule_refresh(_window_key(query_ticker, window_start), _load_window, query_ticker, window_start)
+            # Slicing a sorted index returns a view, not a copy
+            return frame.loc[pd.Timestamp(start_date.date()):]
+        start_date = window_start
+
+    try:
+        frame = single_flight.do(_window_key(query_ticker, start_date), _load_window, query_ticker, start_date)
+    except UpstreamError:
+        if cached is None:
+            raise
+        # Serve the narrower window we already have rather than nothing
+        frame = cached[3]
+    if frame.empty:
+        return frame
+
+    return frame.loc[pd.Timestamp((end_date - timedelta(days=days)).date()):]
+
+# Loads of different widths must not share a result, so the start is part of the key
+def _window_key(query_ticker, start_date):
+    return ("window", query_ticker, start_date.date())
+
+def _load_window(query_ticker, start_date):
+    end_date = datetime.today()
+    frame = get_price_history(query_ticker, start_date, end_date)
+    if not frame.empty:
+        cached = _history_windows.get(query_ticker)
+        # A narrower load that finishes after a wider one only replaces it on a new day
+        if cached is None or start_date.date() <= cached[0] or cached[1] < end_date.date():
+            _history_windows.set(query_ticker, (start_date.date(), end_date.date(), end_date, frame))
+    return frame
+
+# Coarser bars built from the daily history. Bins are closed and labelled on
+# the left, so each bar is dated by the first day of its week/month/quarter.
+TIMEFRAMES = {
+    "Daily": None,
+    "Weekly": "W-MON",
+    "Monthly": "MS",
+    "Quarterly": "QS",
+}
+OHLCV_AGGREGATION = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+RESAMPLED_CACHE_SIZE = 256
+# {(ticker, rule): (first daily date, last daily date, last close, bars)}
+_resampled = LRUCache(max_size=RESAMPLED_CACHE_SIZE)
+
+def _resample(daily, rule):
+    bars = daily.resample(rule, closed="left", label="left").agg(OHLCV_AGGREGATION)
+    return bars.dropna(subset=["Close"])
+
+# Check the daily bars behind the cached periods before the latest one are
+# unchanged: a reload after a split or dividend rewrites all of them
+def _closed_periods_unchanged(daily, bars):
+    if len(bars) < 2:
+        return False
+    closes = daily["Close"].iloc[:daily.index.searchsorted(bars.index[-1])]
+    return len(closes) > 0 and closes.iloc[-1] == bars["Close"].iloc[-2]
+
+# Function to resample a symbol's daily window, reusing the bars built last time:
+# when new daily bars arrive only the latest (still open) period is rebuilt
+def _resampled_bars(query_ticker, rule, daily):
+    first_date, last_date, last_close = daily.index[0], daily.index[-1], daily["Close"].iloc[-1]
+    cached = _resampled.get((query_ticker, rule))
+    if cached is not None and cached[0] == first_date and cached[1] <= last_date and _closed_periods_unchanged(daily, cached[3]):
+        if cached[1:3] == (last_date, last_close):
+            return cached[3]
+        bars = cached[3]
+        tail = _resample(daily.loc[bars.index[-1]:], rule)
+        bars = pd.concat([bars.iloc[:-1], tail])
+    else:
+        bars = _resample(daily, rule)
+
+    _resampled.set((query_ticker, rule), (first_date, last_date, last_close, bars))
+    return bars
+
+# Function to get the last `days` of bars for a symbol in a timeframe from
+# TIMEFRAMES or INTRADAY_TIMEFRAMES
+def get_timeframe_history(query_ticker, days, timeframe="Daily"):
+    if timeframe in INTRADAY_TIMEFRAMES:
+        # The buffers only reach back a few weeks, which every period covers
+        return get_intraday_bars(query_ticker, INTRADAY_TIMEFRAMES[timeframe])
+
+    daily = get_history_window(query_ticker, days)
+    rule = TIMEFRAMES[timeframe]
+    if rule is None or daily.empty:
+        return daily
+
+    # Resample the whole cached window once and slice it, like the daily bars
+    cached = _history_windows.get(query_ticker)
+    window = cached[3] if cached is not None and cached[3].index[0] <= daily.index[0] else daily
+    bars = _resampled_bars(query_ticker, rule, window)
+
+    # Start at the bar whose period contains the first requested day
+    first = max(bars.index.searchsorted(daily.index[0], side="right") - 1, 0)
+    return bars.iloc[first:]
+
+# Intraday bars are kept in memory only, in one ring buffer per (symbol, interval)
+# holding the most recent bars. A top-up downloads just the bars from the last
+# one held onwards and replaces that bar, which may still have been forming.
+INTRADAY_TIMEFRAMES = {"1 Minute": "1m", "5 Minutes": "5m", "15 Minutes": "15m"}
+INTRADAY_BUFFER_BARS = 2000
+INTRADAY_LOOKBACK = {"1m": "5d", "5m": "1mo", "15m": "1mo"}  # first load; Yahoo keeps 1m bars for 7 days
+INTRADAY_TTL = {"1m": 30, "5m": 60, "15m": 120}  # seconds between top-ups
+INTRADAY_IDLE_TIMEOUT = 900  # seconds without a read before a buffer is dropped
+_intraday_buffers = {}  # {(query_ticker, interval): IntradayBuffer}
+_intraday_lock = threading.Lock()
+
+class IntradayBuffer:
+    def __init__(self, query_ticker, interval, max_bars=INTRADAY_BUFFER_BARS):
+        self.query_ticker = query_ticker
+        self.interval = interval
+        self.bars = deque(maxlen=max_bars)  # [(time, open, high, low, close, volume)], oldest dropped first
+        self.updated_at = 0
+        self.read_at = time.time()  # last time a page asked for the bars
+        self._frame = None  # bars as a DataFrame, rebuilt after each change
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return time.time() - self.updated_at >= INTRADAY_TTL[self.interval]
+
+    # Append downloaded bars, replacing any held bars from the first new bar's time on
+    def append(self, data):
+        data = data.reindex(columns=PRICE_COLUMNS)
+        rows = list(zip(data.index, *(data[column].to_numpy() for column in PRICE_COLUMNS)))
+        with self._lock:
+            if rows:
+                while self.bars and self.bars[-1][0] >= rows[0][0]:
+                    self.bars.pop()
+                self.bars.extend(rows)
+                self._frame = None
+            self.updated_at = time.time()
+
+    def to_frame(self):
+        with self._lock:
+            if self._frame is None:
+                frame = pd.DataFrame(list(self.bars), columns=["Date"] + PRICE_COLUMNS).set_index("Date")
+                self._frame = frame
+            return self._frame
+
+    def refresh(self):
+        with self._lock:
+            last_time = self.bars[-1][0] if self.bars else None
+
+        lookback = INTRADAY_LOOKBACK[self.interval]
+        if last_time is None or pd.Timestamp.now(tz=last_time.tz) - last_time > timedelta(days=PERIOD_DAYS[lookback]):
+            data = _fetch_history(self.query_ticker, period=lookback, interval=self.interval)
+        else:
+            data = _fetch_history(self.query_ticker, start=last_time, interval=self.interval)
+        self.append(data)
+        return self.to_frame()
+
+def _intraday_buffer(query_ticker, interval):
+    with _intraday_lock:
+        buffer = _intraday_buffers.get((query_ticker, interval))
+        if buffer is None:
+            buffer = _intraday_buffers[(query_ticker, interval)] = IntradayBuffer(query_ticker, interval)
+        buffer.read_at = time.time()
+    return buffer
+
+# Function to get a symbol's recent intraday bars ("1m", "5m" or "15m"),
+# topping its buffer up when the last top-up is older than INTRADAY_TTL
+def get_intraday_bars(query_ticker, interval="1m"):
+    buffer = _intraday_buffer(query_ticker, interval)
+    if not buffer.is_stale():
+        return buffer.to_frame()
+
+    try:
+        return single_flight.do(("intraday", query_ticker, interval), buffer.refresh)
+    except UpstreamError as e:
+        if not buffer.bars:
+            raise
+        print(f"Serving held intraday bars for {query_ticker}: {e}")
+        return buffer.to_frame()
+
+# Function to get the latest price of a symbol and the time of its bar: the
+# last 1-minute bar, or the last daily close when there are no intraday bars
+def get_live_price(query_ticker):
+    try:
+        bars = get_intraday_bars(query_ticker, "1m")
+    except UpstreamError as e:
+        print(f"Error loading intraday bars for {query_ticker}: {e}")
+        bars = pd.DataFrame(columns=PRICE_COLUMNS)
+    if bars.empty:
+        bars = get_history_window(query_ticker, 7)
+    if bars.empty:
+        return None, None
+    return float(bars["Close"].iloc[-1]), bars.index[-1]
+
+# Function to drop intraday buffers no page has read for INTRADAY_IDLE_TIMEOUT
+def drop_idle_intraday_buffers():
+    cutoff = time.time() - INTRADAY_IDLE_TIMEOUT
+    with _intraday_lock:
+        idle = [key for key, buffer in _intraday_buffers.items() if buffer.read_at < cutoff]
+        for key in idle:
+            del _intraday_buffers[key]
+    return len(idle)
+
+# Function to top up every intraday buffer a page is still reading, used by the cache warmer
+def refresh_intraday_buffers():
+    drop_idle_intraday_buffers()
+    with _intraday_lock:
+        buffers = list(_intraday_buffers.values())
+    for buffer in buffers:
+        if not buffer.is_stale():
+            continue
+        try:
+            single_flight.do(("intraday", buffer.query_ticker, buffer.interval), buffer.refresh)
+        except UpstreamError as e:
+            print(f"Could not refresh intraday bars for {buffer.query_ticker}: {e}")
+    return len(buffers)
+
+# Large US listings loaded into the symbol master next to the NSE equity list
+US_SYMBOLS = {
+    "AAPL": "Apple Inc.",
+    "MSFT": "Microsoft Corporation",
+    "GOOGL": "Alphabet Inc.",
+    "GOOG": "Alphabet Inc.",
+    "AMZN": "Amazon.com Inc.",
+    "META": "Meta Platforms, Inc.",
+    "NVDA": "NVIDIA Corporation",
+    "TSLA": "Tesla, Inc.",
+    "NFLX": "Netflix, Inc.",
+    "BRK-B": "Berkshire Hathaway Inc.",
+    "JPM": "JPMorgan Chase & Co.",
+    "V": "Visa Inc.",
+    "MA": "Mastercard Incorporated",
+    "UNH": "UnitedHealth Group Incorporated",
+    "JNJ": "Johnson & Johnson",
+    "XOM": "Exxon Mobil Corporation",
+    "WMT": "Walmart Inc.",
+    "PG": "The Procter & Gamble Company",
+    "HD": "The Home Depot, Inc.",
+    "KO": "The Coca-Cola Company",
+    "PEP": "PepsiCo, Inc.",
+    "DIS": "The Walt Disney Company",
+    "BAC": "Bank of America Corporation",
+    "INTC": "Intel Corporation",
+    "AMD": "Advanced Micro Devices, Inc.",
+    "ORCL": "Oracle Corporation",
+    "CRM": "Salesforce, Inc.",
+    "ADBE": "Adobe Inc.",
+    "CSCO": "Cisco Systems, Inc.",
+    "IBM": "International Business Machines Corporation",
+    "QCOM": "QUALCOMM Incorporated",
+    "AVGO": "Broadcom Inc.",
+    "PYPL": "PayPal Holdings, Inc.",
+    "UBER": "Uber Technologies, Inc.",
+    "BA": "The Boeing Company",
+    "NKE": "NIKE, Inc.",
+    "MCD": "McDonald's Corporation",
+    "COST": "Costco Wholesale Corporation",
+    "PFE": "Pfizer Inc.",
+    "T": "AT&T Inc.",
+    "VZ": "Verizon Communications Inc.",
+}
+
+# In-memory exchange resolution index built from the stocks table:
+# {bare ticker: (exchange suffix, company name, isin)}
+SYMBOL_MASTER_REFRESH = 86400  # seconds
+_symbol_index = None
+_symbol_master_attempted_at = 0
+_symbol_lock = threading.Lock()
+
+# Function to fetch the NSE equity list with company names and ISINs
+def fetch_nse_symbols():
+    return call_upstream(nse.name, nse.equity_list)
+
+def _build_symbol_index(rows):
+    index = {}
+    for symbol, exchange_suffix, company_name, isin in rows:
+        bare_symbol, suffix = db.split_symbol(symbol)
+        if suffix is None:
+            suffix = exchange_suffix
+        if suffix is None:
+            # Created from user input before the exchange was known
+            continue
+        # Master rows (bare symbol) take precedence over suffixed copies
+        if bare_symbol not in index or bare_symbol == symbol:
+            index[bare_symbol] = (suffix, company_name, isin)
+    return index
+
+# Function to bulk-load the NSE and US listings into the stocks table
+def refresh_symbol_master():
+    return single_flight.do(("symbol_master",), _refresh_symbol_master)
+
+def _refresh_symbol_master():
+    global _symbol_index, _symbol_master_attempted_at
+    _symbol_master_attempted_at = time.time()
+
+    entries = []
+    try:
+        entries.extend(fetch_nse_symbols())
+    except Exception as e:
+        print(f"Could not load NSE symbol list: {e}")
+    entries.extend(
+        {"symbol": symbol, "company_name": name, "exchange_suffix": "", "isin": None}
+        for symbol, name in US_SYMBOLS.items()
+    )
+
+    added = db.load_symbol_master(entries)
+    with _symbol_lock:
+        _symbol_index = _build_symbol_index(db.get_symbol_master())
+    return added
+
+def _get_symbol_index():
+    global _symbol_index
+    if _symbol_index is None:
+        with _symbol_lock:
+            if _symbol_index is None:
+                _symbol_index = _build_symbol_index(db.get_symbol_master())
+
+    # Load the master once if the table only has user-created stocks
+    has_nse = any(entry[0] == ".NS" for entry in _symbol_index.values())
+    if not has_nse and time.time() - _symbol_master_attempted_at > SYMBOL_MASTER_REFRESH:
+        refresh_symbol_master()
+    return _symbol_index
+
+# Function to resolve a bare ticker to its Yahoo Finance symbol, or None if unknown
+def resolve_symbol(ticker):
+    _, suffix = db.split_symbol(ticker)
+    if suffix:
+        return ticker
+
+    entry = _get_symbol_index().get(ticker)
+    if entry is None:
+        return None
+    return f"{ticker}{entry[0]}"
+
+# Function to list every known stock as (symbol, exchange_suffix, company_name)
+def get_listings():
+    return [(symbol, entry[0], entry[1]) for symbol, entry in _get_symbol_index().items()]
+
+# Function to reload the symbol master if the last attempt is more than a day old
+def refresh_symbol_master_if_stale():
+    if time.time() - _symbol_master_attempted_at > SYMBOL_MASTER_REFRESH:
+        return refresh_symbol_master()
+    return 0
+
+# Tickers the probe found on neither Indian exchange. Kept in memory only, so
+# typos never become listings and a later NSE listing is picked up.
+PROBE_MISS_TTL = 86400  # seconds
+PROBE_MISS_CACHE_SIZE = 1024
+_probe_misses = TTLCache(max_size=PROBE_MISS_CACHE_SIZE, max_stale=1)
+
+# Function to find the exchange suffix of an unknown ticker by probing Yahoo
+# Finance; "" when it is not listed in India
+def probe_exchange(ticker):
+    if _probe_misses.get(ticker)[0]:
+        return ""
+    return single_flight.do(("probe", ticker), _probe_exchange, ticker)
+
+def _probe_exchange(ticker):
+    for suffix in (".NS", ".BO"):
+        test_data = _fetch_history(f"{ticker}{suffix}", period="5d")
+        if not test_data.empty:
+            remember_symbol(ticker, suffix)
+            return suffix
+    _probe_misses.set(ticker, True, PROBE_MISS_TTL)
+    return ""
+
+# Function to remember an exchange found by probing so it is never probed again
+def remember_symbol(ticker, exchange_suffix):
+    db.load_symbol_master([{"symbol": ticker, "exchange_suffix": exchange_suffix}])
+    with _symbol_lock:
+        if _symbol_index is not None:
+            _symbol_index[ticker] = (exchange_suffix, None, None)
+
+# Short-lived quote cache shared by the watchlist, portfolio and market watch pages
+QUOTE_TTL = 60  # seconds
+QUOTE_CACHE_SIZE = 5000  # symbols
+
+class QuoteService:
+    def __init__(self, ttl=QUOTE_TTL, max_size=QUOTE_CACHE_SIZE):
+        self.ttl = ttl
+        self._quotes = TTLCache(max_size=max_size)  # {symbol: quote}
+
+    # Get {symbol: quote} for many symbols with at most one batched download.
+    # Expired quotes are served as-is while a background refresh replaces them,
+    # until they are STALE_TTLS TTLs old.
+    def get_quotes(self, symbols):
+        symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+        quotes = {}
+        stale = []
+        for symbol in symbols:
+            found = self._quotes.lookup(symbol)
+            if found is not None:
+                quotes[symbol] = found[0]
+                if not found[1]:
+                    stale.append(symbol)
+
+        if stale:
+            schedule_refresh(("quotes",) + tuple(sorted(stale)), self._fetch_and_store, stale)
+
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing:
+            try:
+                quotes.update(single_flight.do(("quotes",) + tuple(sorted(missing)), self._fetch_and_store, missing))
+            except UpstreamError as e:
+                print(f"Error downloading quotes for {missing}: {e}")
+
+        return quotes
+
+    def get_quote(self, symbol):
+        return self.get_quotes([symbol]).get(symbol)
+
+    # Re-download quotes even if cached, used by the background cache warmer
+    def refresh(self, symbols):
+        symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+        if not symbols:
+            return {}
+        return single_flight.do(("quotes",) + tuple(sorted(symbols)), self._fetch_and_store, symbols)
+
+    def _fetch_and_store(self, symbols):
+        fetched = self._fetch(symbols)
+        for symbol, quote in fetched.items():
+            self._quotes.set(symbol, quote, self.ttl)
+        return fetched
+
+    def _fetch(self, symbols):
+        return call_upstream(prices.name, prices.quotes, symbols)
+
+quote_service = QuoteService()
+
+# Fundamentals are loaded one dataset at a time, each with its own TTL:
+# statements change quarterly, news changes hourly
+FUNDAMENTALS_TTL = {
+    "info": 86400,
+    "recommendations": 86400,
+    "institutional_holders": 7 * 86400,
+    "balance_sheet": 7 * 86400,
+    "financials": 7 * 86400,
+    "cashflow": 7 * 86400,
+    "earnings": 7 * 86400,
+    "news": 3600,
+}
+_fundamentals_cache = TTLCache()
+# Fundamentals endpoints fail on their own (quoteSummary 404s and timeouts),
+# so they trip their own breaker rather than the one price history uses
+FUNDAMENTALS_BREAKER = f"{prices.name}-fundamentals"
+
+# Function to get a single fundamentals dataset (e.g. "news") for a symbol
+def get_fundamentals(query_ticker, dataset):
+    if dataset not in FUNDAMENTALS_TTL:
+        raise ValueError(f"Unknown fundamentals dataset: {dataset}")
+
+    return _fundamentals_cache.get_or_fetch(
+        (query_ticker, dataset),
+        FUNDAMENTALS_TTL[dataset],
+        lambda: call_upstream(FUNDAMENTALS_BREAKER, prices.fundamentals, query_ticker, dataset)
+    )
+
+# Full company profile: every fundamentals dataset fetched concurrently on a
+# bounded pool, so the wait is the slowest single call rather than the sum
+FUNDAMENTALS_WORKERS = 8
+FUNDAMENTALS_TIMEOUT = 10  # seconds
+_fundamentals_pool = ThreadPoolExecutor(max_workers=FUNDAMENTALS_WORKERS, thread_name_prefix="fundamentals")
+
+# Function to get info plus every other dataset merged into one dict
+def get_full_profile(query_ticker, datasets=None, timeout=FUNDAMENTALS_TIMEOUT):
+    datasets = datasets or list(FUNDAMENTALS_TTL)
+    futures = {
+        dataset: _fundamentals_pool.submit(get_fundamentals, query_ticker, dataset)
+        for dataset in datasets
+    }
+
+    deadline = time.time() + timeout
+    profile = {}
+    for dataset, future in futures.items():
+        try:
+            value = future.result(timeout=max(0, deadline - time.time()))
+        except Exception as e:
+            # Slow or failing datasets are left out; a timed-out fetch keeps
+            # running and fills the cache for the next request
+            print(f"Could not load {dataset} for {query_ticker}: {e!r}")
+            continue
+
+        if dataset == "info":
+            profile.update(value or {})
+        else:
+            profile[dataset] = value
+    return profile
+
+# NSE responses are cached per endpoint, each with its own TTL. Expired
+# entries keep being served while a background refresh replaces them.
+NSE_TTL = {
+    "all_index_quotes": 30,
+    "market_status": 60,
+    "top_gainers": 60,
+    "top_losers": 60,
+    "stock_quote": 30,
+    "stock_codes": 86400,
+}
+_nse_cache = TTLCache()
+
+# Function to call an NSE provider method (e.g. "stock_quote") through its endpoint cache
+def nse_request(method, *args):
+    if method not in NSE_TTL:
+        raise ValueError(f"Unknown NSE endpoint: {method}")
+
+    return _nse_cache.get_or_fetch(
+        (method,) + args,
+        NSE_TTL[method],
+        lambda: call_upstream(nse.name, getattr(nse, method), *args)
+    )
+
+# Function to get one NSE index (e.g. "nifty bank") from the shared all-indices response
+def get_index_quote(index_name):
+    return pick_index_quote(nse_request("all_index_quotes"), index_name)
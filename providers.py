@@ -0,0 +1,514 @@
+import csv
+import json
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFDataException, YFInvalidPeriodError, YFTickerMissingError
+from nsetools import Nse
+
+# Columns every provider returns for price bars
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Extra columns when history() is asked for corporate actions (0 on days without one)
+ACTION_COLUMNS = ["Dividends", "Stock Splits"]
+
+# yfinance errors that mean the symbol has no data, not that Yahoo is failing
+YF_NO_DATA_ERRORS = (YFTickerMissingError, YFInvalidPeriodError)
+
+# What the app reads from a market data source, in two halves: prices (yfinance)
+# and exchange data (nsetools). Implementations return empty results when a
+# symbol has no data and raise when the source is failing.
+class PriceProvider(ABC):
+    name = "base"
+
+    # Split and dividend adjusted bars as a DataFrame of PRICE_COLUMNS (plus
+    # ACTION_COLUMNS if actions is set), daily bars indexed by plain dates
+    @abstractmethod
+    def history(self, symbol, start=None, end=None, period=None, interval="1d", actions=False):
+        pass
+
+    # {symbol: {"price", "previous_close", "change", "change_pct", "volume"}}
+    @abstractmethod
+    def quotes(self, symbols):
+        pass
+
+    # One fundamentals dataset, e.g. "info", "news" or "financials"
+    @abstractmethod
+    def fundamentals(self, symbol, dataset):
+        pass
+
+class ExchangeProvider(ABC):
+    name = "base"
+
+    # Every NSE index in one response, as nsetools' get_all_index_quote() returns it
+    @abstractmethod
+    def all_index_quotes(self):
+        pass
+
+    def index_quote(self, index_name):
+        return pick_index_quote(self.all_index_quotes(), index_name)
+
+    @abstractmethod
+    def market_status(self):
+        pass
+
+    @abstractmethod
+    def top_gainers(self):
+        pass
+
+    @abstractmethod
+    def top_losers(self):
+        pass
+
+    # Exchange quote for a bare NSE symbol, with the keys NSE's quote API returns
+    @abstractmethod
+    def stock_quote(self, symbol):
+        pass
+
+    # [{"symbol", "company_name", "exchange_suffix", "isin"}] for every listed equity
+    @abstractmethod
+    def equity_list(self):
+        pass
+
+    # {symbol: company name} for every listed equity
+    def stock_codes(self):
+        return {entry["symbol"]: entry["company_name"] or entry["symbol"] for entry in self.equity_list()}
+
+# A source that serves both halves
+class MarketDataProvider(PriceProvider, ExchangeProvider):
+    pass
+
+# Function to get what a provider returns for a fundamentals dataset a symbol does not have
+def empty_fundamentals(dataset):
+    if dataset == "info":
+        return {}
+    if dataset == "news":
+        return []
+    return pd.DataFrame()
+
+# Function to turn the last two bars of a history frame into a quote
+def quote_from_history(history):
+    history = history.dropna(subset=["Close"])
+    if history.empty:
+        return None
+
+    last = history.iloc[-1]
+    price = float(last["Close"])
+    previous_close = float(history["Close"].iloc[-2]) if len(history) > 1 else None
+    change = price - previous_close if previous_close else None
+    return {
+        "price": price,
+        "previous_close": previous_close,
+        "change": change,
+        "change_pct": (change / previous_close) * 100 if previous_close else None,
+        "volume": float(last["Volume"]) if pd.notna(last["Volume"]) else 0.0,
+    }
+
+# Function to find one index in an all_index_quotes() list, or None if it is not listed
+def pick_index_quote(all_quotes, index_name):
+    index_name = " ".join(index_name.upper().split())
+    for quote in all_quotes or []:
+        if quote.get("indexSymbol") == index_name:
+            # nsetools 2 reports last/percentChange; the pages read lastPrice/pChange
+            return {**quote, "lastPrice": quote.get("last"), "pChange": quote.get("percentChange")}
+    return None
+
+class YFinanceProvider(PriceProvider):
+    name = "yfinance"
+
+    def __init__(self):
+        # yf.download collects each batch in module-level dicts that every call
+        # resets, so batches run one at a time
+        self._download_lock = threading.Lock()
+
+    def history(self, symbol, start=None, end=None, period=None, interval="1d", actions=False):
+        kwargs = {"start": start, "end": end} if start is not None else {"period": period or "1mo"}
+        columns = PRICE_COLUMNS + ACTION_COLUMNS if actions else PRICE_COLUMNS
+        try:
+            # raise_errors lets us tell an outage apart from a symbol with no data
+            data = yf.Ticker(symbol).history(interval=interval, auto_adjust=True, actions=actions, raise_errors=True, **kwargs)
+        except YF_NO_DATA_ERRORS:
+            return pd.DataFrame(columns=columns)
+        if data is None or data.empty:
+            return pd.DataFrame(columns=columns)
+
+        data = data.reindex(columns=columns, fill_value=0.0) if actions else data[[col for col in PRICE_COLUMNS if col in data.columns]]
+        if interval in ("1d", "1wk", "1mo") and data.index.tz is not None:
+            # Daily bars are dated in exchange time; keep them as plain dates
+            data.index = data.index.tz_localize(None)
+        data.index.name = "Date"
+        return data
+
+    def quotes(self, symbols):
+        with self._download_lock:
+            data = yf.download(symbols, period="5d", group_by="ticker", progress=False)
+
+        quotes = {}
+        for symbol in symbols:
+            if data is None or data.empty:
+                break
+            try:
+                history = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+            except KeyError:
+                # Symbol missing from the batch (delisted or typo)
+                continue
+            # A symbol that failed comes back as all-NaN columns
+            quote = quote_from_history(history)
+            if quote:
+                quotes[symbol] = quote
+
+        if symbols and not quotes and not self.history(symbols[0], period="5d").empty:
+            # history() returns empty for an unknown symbol and raises when Yahoo
+            # is failing, so reaching here means the batch failed on its own
+            raise RuntimeError(f"Download returned no prices for {symbols}")
+        return quotes
+
+    def fundamentals(self, symbol, dataset):
+        try:
+            return getattr(yf.Ticker(symbol), dataset)
+        except YF_NO_DATA_ERRORS + (YFDataException,):
+            return empty_fundamentals(dataset)
+        except Exception as e:
+            # A 404 (curl_cffi's HTTPError, not requests') means Yahoo has no such data
+            if getattr(getattr(e, "response", None), "status_code", None) == 404:
+                return empty_fundamentals(dataset)
+            raise
+
+class NseProvider(ExchangeProvider):
+    name = "nse"
+
+    def __init__(self):
+        self._client = None
+        # nsetools shares one requests.Session (re-created when its cookies
+        # expire) and a class-level response cache, neither of them thread-safe
+        self._lock = threading.RLock()
+
+    # nsetools opens an HTTP session on construction, so build it on first use
+    # and keep it (and its cookies) for the life of the process
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = Nse()
+            return self._client
+
+    def _call(self, method, *args):
+        with self._lock:
+            return getattr(self.client, method)(*args)
+
+    def _fetch_json(self, url):
+        with self._lock:
+            return self.client.session.fetch(url).json()
+
+    def all_index_quotes(self):
+        return self._call("get_all_index_quote")
+
+    def market_status(self):
+        # nsetools 2 dropped get_market_status, so read the endpoint it used
+        from nsetools import urls
+        states = self._fetch_json(f"{urls.NSE_MAIN}/api/marketStatus").get("marketState", [])
+        for state in states:
+            if state.get("market") == "Capital Market":
+                return state.get("marketStatus")
+        return None
+
+    def top_gainers(self):
+        return self._call("get_top_gainers")
+
+    def top_losers(self):
+        return self._call("get_top_losers")
+
+    def stock_quote(self, symbol):
+        return self._call("get_quote", symbol)
+
+    def equity_list(self):
+        try:
+            # get_stock_codes() parses EQUITY_L.csv but keeps only the symbols,
+            # so read the same file directly to get names and ISINs as well
+            from nsetools import urls
+            with self._lock:
+                response = self.client.session.fetch(urls.STOCKS_CSV_URL)
+            entries = []
+            for row in csv.DictReader(response.text.splitlines()):
+                row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+                entries.append({
+                    "symbol": row["SYMBOL"],
+                    "company_name": row.get("NAME OF COMPANY") or None,
+                    "exchange_suffix": ".NS",
+                    "isin": row.get("ISIN NUMBER") or None,
+                })
+            if entries:
+                return entries
+        except Exception as e:
+            print(f"Could not read NSE equity list, falling back to stock codes: {e}")
+
+        codes = self._call("get_stock_codes")
+        if isinstance(codes, dict):
+            # nsetools 1.x returns {symbol: company name} with a header entry
+            items = [(code, name) for code, name in codes.items() if code != "SYMBOL"]
+        else:
+            items = [(code, None) for code in codes]
+        return [
+            {"symbol": code, "company_name": name, "exchange_suffix": ".NS", "isin": None}
+            for code, name in items
+        ]
+
+# Calendar days covered by yfinance period strings
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 365, "2y": 730, "5y": 1826, "10y": 3652, "ytd": 366, "max": 3652,
+}
+INTRADAY_FREQ = {"1m": "1min", "2m": "2min", "5m": "5min", "15m": "15min", "30m": "30min", "60m": "60min", "1h": "60min"}
+FIXTURE_EPOCH = pd.Timestamp("2010-01-04")
+FIXTURE_INDICES = ["NIFTY 50", "NIFTY BANK", "NIFTY IT", "NIFTY NEXT 50", "NIFTY MIDCAP 100"]
+
+# Offline provider for benchmarks and load tests. Recorded responses under
+# the fixtures directory are replayed when present:
+#   history/<SYMBOL>.csv              Date,Open,High,Low,Close,Volume
+#   fundamentals/<SYMBOL>/<dataset>.json
+#   nse/<method>.json or nse/<method>_<arg>.json
+# Anything not recorded is generated from a random walk seeded by the symbol,
+# so the same request always returns the same data.
+class FixtureProvider(MarketDataProvider):
+    name = "fixture"
+
+    def __init__(self, fixtures_dir="fixtures"):
+        self.fixtures_dir = fixtures_dir
+        self._series = {}  # {symbol: (built_on, daily frame)}
+        self._lock = threading.Lock()
+
+    def _path(self, *parts):
+        return os.path.join(self.fixtures_dir, *parts)
+
+    def _load_json(self, *parts):
+        path = self._path(*parts)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _rng(self, *key):
+        return np.random.default_rng(zlib.crc32("|".join(str(part) for part in key).encode()))
+
+    # Full daily series for a symbol, recorded or generated up to today
+    def _daily_series(self, symbol):
+        today = datetime.today().date()
+        with self._lock:
+            cached = self._series.get(symbol)
+        if cached is not None and cached[0] == today:
+            return cached[1]
+
+        path = self._path("history", f"{symbol}.csv")
+        if os.path.exists(path):
+            series = pd.read_csv(path, index_col="Date", parse_dates=True)[PRICE_COLUMNS].sort_index()
+        else:
+            dates = pd.bdate_range(FIXTURE_EPOCH, pd.Timestamp.today().normalize())
+            rng = self._rng("history", symbol)
+            start_price = rng.uniform(20, 2000)
+            returns = rng.normal(0.0001, 0.015, len(dates))
+            close = start_price * np.exp(np.cumsum(returns))
+            spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+            open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+            series = pd.DataFrame({
+                "Open": open_,
+                "High": np.maximum(open_, close) + spread,
+                "Low": np.minimum(open_, close) - spread,
+                "Close": close,
+                "Volume": rng.integers(100_000, 5_000_000, len(dates)).astype(float),
+            }, index=dates)
+        series.index.name = "Date"
+
+        with self._lock:
+            self._series[symbol] = (today, series)
+        return series
+
+    def history(self, symbol, start=None, end=None, period=None, interval="1d", actions=False):
+        if start is None:
+            end = datetime.today()
+            start = end - timedelta(days=PERIOD_DAYS.get(period or "1mo", 31))
+        end = end or datetime.today()
+
+        if interval in INTRADAY_FREQ:
+            return self._intraday(symbol, pd.Timestamp(start), pd.Timestamp(end), INTRADAY_FREQ[interval])
+
+        series = self._daily_series(symbol)
+        # end is exclusive, like yfinance
+        window = series.loc[pd.Timestamp(start).normalize():pd.Timestamp(end).normalize() - timedelta(days=1)]
+        if interval in ("1wk", "1mo"):
+            window = window.resample("W-MON" if interval == "1wk" else "MS").agg({
+                "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum",
+            }).dropna(subset=["Close"])
+        if actions:
+            # Fixture series are never split and pay no dividends
+            return window.assign(**{column: 0.0 for column in ACTION_COLUMNS})
+        return window.copy()
+
+    # Intraday bars during market hours, walking from each day's daily open to its close
+    def _intraday(self, symbol, start, end, freq):
+        series = self._daily_series(symbol)
+        frames = []
+        for day, bar in series.loc[start.normalize():end.normalize()].iterrows():
+            times = pd.date_range(day + timedelta(hours=9, minutes=30), day + timedelta(hours=15, minutes=59), freq=freq)
+            times = times[(times >= start) & (times <= end)]
+            if times.empty:
+                continue
+            rng = self._rng("intraday", symbol, day.date(), freq)
+            path = np.linspace(bar["Open"], bar["Close"], len(times)) * (1 + rng.normal(0, 0.001, len(times)))
+            path = np.clip(path, bar["Low"], bar["High"])
+            opens = np.concatenate([[bar["Open"]], path[:-1]])
+            frames.append(pd.DataFrame({
+                "Open": opens,
+                "High": np.maximum(opens, path) * 1.0005,
+                "Low": np.minimum(opens, path) * 0.9995,
+                "Close": path,
+                "Volume": np.full(len(times), bar["Volume"] / len(times)).round(),
+            }, index=times))
+        if not frames:
+            return pd.DataFrame(columns=PRICE_COLUMNS)
+        return pd.concat(frames)
+
+    def quotes(self, symbols):
+        quotes = {}
+        for symbol in symbols:
+            quote = quote_from_history(self._daily_series(symbol).iloc[-5:])
+            if quote:
+                quotes[symbol] = quote
+        return quotes
+
+    def fundamentals(self, symbol, dataset):
+        recorded = self._load_json("fundamentals", symbol, f"{dataset}.json")
+        if recorded is not None:
+            return recorded if dataset in ("info", "news") else pd.DataFrame(recorded)
+
+        if dataset == "info":
+            last = self._daily_series(symbol).iloc[-260:]
+            return {
+                "symbol": symbol,
+                "longName": f"{symbol} Fixture Corp.",
+                "sector": "Technology",
+                "industry": "Software",
+                "country": "United States",
+                "exchange": "FIX",
+                "marketCap": float(last["Close"].iloc[-1]) * 1e9,
+                "trailingPE": 20.0,
+                "previousClose": float(last["Close"].iloc[-2]),
+                "fiftyTwoWeekLow": float(last["Low"].min()),
+                "fiftyTwoWeekHigh": float(last["High"].max()),
+                "longBusinessSummary": f"Deterministic fixture data for {symbol}.",
+            }
+        return empty_fundamentals(dataset)
+
+    def _replay(self, method, *args):
+        name = "_".join((method,) + tuple(str(arg).replace(" ", "_").lower() for arg in args))
+        return self._load_json("nse", f"{name}.json")
+
+    def all_index_quotes(self):
+        recorded = self._replay("all_index_quotes")
+        if recorded is not None:
+            return recorded
+
+        quotes = []
+        for index_name in FIXTURE_INDICES:
+            bars = self._daily_series(index_name).iloc[-260:]
+            quote = quote_from_history(bars.iloc[-5:])
+            quotes.append({
+                "indexSymbol": index_name,
+                "last": round(quote["price"], 2),
+                "variation": round(quote["change"], 2),
+                "percentChange": round(quote["change_pct"], 2),
+                "previousClose": round(quote["previous_close"], 2),
+                "yearHigh": round(bars["High"].max(), 2),
+                "yearLow": round(bars["Low"].min(), 2),
+            })
+        return quotes
+
+    def market_status(self):
+        recorded = self._replay("market_status")
+        return recorded if recorded is not None else "Closed"
+
+    def _movers(self, gainers):
+        # Rank a bounded slice of the list so a large recorded one stays cheap
+        codes = list(self.stock_codes())[:50]
+        movers = []
+        for symbol in codes:
+            quote = quote_from_history(self._daily_series(f"{symbol}.NS").iloc[-5:])
+            movers.append({"symbol": symbol, "ltp": round(quote["price"], 2), "netPrice": round(quote["change"], 2), "pChange": round(quote["change_pct"], 2)})
+        movers.sort(key=lambda mover: mover["pChange"], reverse=gainers)
+        return movers[:10]
+
+    def top_gainers(self):
+        recorded = self._replay("top_gainers")
+        return recorded if recorded is not None else self._movers(True)
+
+    def top_losers(self):
+        recorded = self._replay("top_losers")
+        return recorded if recorded is not None else self._movers(False)
+
+    def stock_quote(self, symbol):
+        recorded = self._replay("stock_quote", symbol)
+        if recorded is not None:
+            return recorded
+
+        bars = self._daily_series(f"{symbol}.NS").iloc[-260:]
+        last = bars.iloc[-1]
+        quote = quote_from_history(bars.iloc[-5:])
+        rng = self._rng("stock_quote", symbol)
+        eps = round(quote["price"] / rng.uniform(10, 40), 2)
+        return {
+            "companyName": self.stock_codes().get(symbol, f"{symbol} Ltd"),
+            "series": "EQ",
+            "isinCode": f"INE{zlib.crc32(symbol.encode()) % 1_000_000:06d}01",
+            "industryInfo": "Fixture Industry",
+            "lastPrice": round(quote["price"], 2),
+            "change": round(quote["change"], 2),
+            "pChange": round(quote["change_pct"], 2),
+            "open": round(float(last["Open"]), 2),
+            "dayHigh": round(float(last["High"]), 2),
+            "dayLow": round(float(last["Low"]), 2),
+            "previousClose": round(quote["previous_close"], 2),
+            "high52": round(float(bars["High"].max()), 2),
+            "low52": round(float(bars["Low"].min()), 2),
+            "totalTradedVolume": int(last["Volume"]),
+            "deliveryQuantity": round(rng.uniform(20, 80), 2),
+            "marketCapFullFloat": round(quote["price"] * rng.uniform(1e7, 1e9) / 1e7, 2),  # crore
+            "eps": eps,
+            "pe": round(quote["price"] / eps, 2),
+            "bookValue": round(quote["price"] / rng.uniform(1, 8), 2),
+        }
+
+    def equity_list(self):
+        recorded = self._replay("equity_list")
+        if recorded is not None:
+            return recorded
+        names = {
+            "RELIANCE": "Reliance Industries Limited",
+            "TCS": "Tata Consultancy Services Limited",
+            "INFY": "Infosys Limited",
+            "HDFCBANK": "HDFC Bank Limited",
+            "ICICIBANK": "ICICI Bank Limited",
+            "TATASTEEL": "Tata Steel Limited",
+            "TATAMOTORS": "Tata Motors Limited",
+            "SBIN": "State Bank of India",
+            "WIPRO": "Wipro Limited",
+            "ITC": "ITC Limited",
+        }
+        return [
+            {"symbol": symbol, "company_name": name, "exchange_suffix": ".NS", "isin": None}
+            for symbol, name in names.items()
+        ]
+
+# Function to build the (prices, nse) providers selected by MARKET_DATA_PROVIDER:
+# "live" (default) uses yfinance and nsetools, "fixture" serves everything offline
+# from MARKET_DATA_FIXTURES (default: ./fixtures)
+def create_providers():
+    kind = os.getenv("MARKET_DATA_PROVIDER", "live").lower()
+    if kind == "fixture":
+        fixture = FixtureProvider(os.getenv("MARKET_DATA_FIXTURES", "fixtures"))
+        return fixture, fixture
+    if kind != "live":
+        print(f"Unknown MARKET_DATA_PROVIDER '{kind}', using live providers")
+    return YFinanceProvider(), NseProvider()
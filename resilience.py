@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Retry settings for upstream calls (full-jitter exponential backoff)
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5  # seconds
+RETRY_MAX_DELAY = 8  # seconds
+
+# Circuit breaker settings, per provider
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive calls that failed every retry
+BREAKER_RESET_TIMEOUT = 30  # seconds
+
+class UpstreamError(Exception):
+    pass
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+# Process-wide request coalescing: concurrent callers asking for the same key
+# wait on one upstream fetch and share its result (or its exception)
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # {key: Future}
+        self._lock = threading.Lock()
+
+    def do(self, key, fetch, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = fetch(*args, **kwargs)
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+single_flight = SingleFlight()
+
+# Opens after repeated consecutive failures so callers stop hammering a provider
+# that is down or throttling us; one trial call is let through after the timeout
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.time() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.time() - self.opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"{self.name} circuit is open, skipping upstream call")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+breakers = {}  # {provider name: CircuitBreaker}
+_breakers_lock = threading.Lock()
+
+def get_breaker(provider):
+    with _breakers_lock:
+        if provider not in breakers:
+            breakers[provider] = CircuitBreaker(provider)
+        return breakers[provider]
+
+# Function to call a provider with retries and its circuit breaker. Providers
+# return empty results for symbols without data, so any exception is a failure.
+def call_upstream(provider, fetch, *args, **kwargs):
+    breaker = get_breaker(provider)
+    breaker.before_call()
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            result = fetch(*args, **kwargs)
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                # One failure per call, once its retries are used up
+                breaker.record_failure()
+                raise UpstreamError(f"{provider} call failed after {RETRY_ATTEMPTS} attempts: {e!r}") from e
+            time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+        else:
+            breaker.record_success()
+            return result
+
+# Background refreshes for stale-while-revalidate
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="refresh")
+
+# Function to refresh a value in the background, at most once per key at a time
+def schedule_refresh(key, fetch, *args, **kwargs):
+    if single_flight.in_flight(key):
+        return
+
+    def refresh():
+        try:
+            single_flight.do(key, fetch, *args, **kwargs)
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+
+    _refresh_pool.submit(refresh)
+
+# TTL cache defaults
+TTL_CACHE_SIZE = 1024  # entries, least recently used dropped first
+STALE_TTLS = 10  # an entry older than this many TTLs is dropped instead of served stale
+
+# Small thread-safe cache where every entry carries its own TTL. Expired
+# entries are still served while a background refresh replaces them, until
+# they are max_stale TTLs old.
+class TTLCache:
+    def __init__(self, max_size=TTL_CACHE_SIZE, max_stale=STALE_TTLS):
+        self.max_size = max_size
+        self.max_stale = max_stale
+        self._entries = OrderedDict()  # {key: (fetched_at, ttl, value)}, least recently used first
+        self._lock = threading.Lock()
+
+    # (value, fresh) for a key, or None if nothing usable is cached
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.time() - entry[0]
+            if age >= entry[1] * self.max_stale:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return entry[2], age < entry[1]
+
+    def get(self, key):
+        found = self.lookup(key)
+        if found and found[1]:
+            return True, found[0]
+        return False, None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time(), ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # Return the cached value (fresh or stale), or call fetch() once across all
+    # waiting callers when there is nothing cached yet
+    def get_or_fetch(self, key, ttl, fetch):
+        found = self.lookup(key)
+        flight_key = ("cache", id(self), key)
+
+        if found is not None:
+            value, fresh = found
+            if not fresh:
+                schedule_refresh(flight_key, self._fetch_and_set, key, ttl, fetch)
+            return value
+
+        return single_flight.do(flight_key, self._fetch_and_set, key, ttl, fetch)
+
+    def _fetch_and_set(self, key, ttl, fetch):
+        value = fetch()
+        self.set(key, value, ttl)
+        return value
@@ -0,0 +1,164 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+import market_data
+from resilience import TTLCache
+
+SEARCH_INDEX_TTL = 86400  # seconds, rebuilt once a day
+SEARCH_LIMIT = 10
+MAX_PREFIX = 12  # longer queries are matched on their first 12 characters, then verified
+FUZZY_MIN_SCORE = 0.2  # trigram Jaccard similarity with the symbol or company name
+
+# Match tiers, best first
+EXACT_SYMBOL, SYMBOL_PREFIX, NAME_PREFIX, FUZZY = range(4)
+
+def _words(text):
+    return re.findall(r"[a-z0-9&]+", text.lower())
+
+def _trigrams(text):
+    text = f" {' '.join(_words(text))} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# In-memory search over symbol and company name: prefix maps answer the
+# as-you-type case, trigram maps catch typos ("relaince"). Prefix postings are
+# kept in result order, so a common prefix ("lim") only reads the first few.
+class SymbolSearchIndex:
+    def __init__(self, listings):
+        self.entries = []  # [(symbol, exchange_suffix, company_name)]
+        self._symbols = {}  # {lowercase symbol: entry id}
+        self._symbol_prefixes = defaultdict(list)  # {prefix: [entry id]}, shortest symbol first
+        self._word_prefixes = defaultdict(set)  # {prefix of a name word: {entry id}}
+        self._ranked_word_prefixes = {}  # {prefix: [entry id]}, best name match first
+        self._symbol_trigrams = defaultdict(list)  # {trigram: [entry id]}
+        self._name_trigrams = defaultdict(list)
+        self._entry_stats = []  # [(first word, word count, symbol trigram count, name trigram count)]
+
+        for symbol, exchange_suffix, company_name in sorted(listings):
+            entry_id = len(self.entries)
+            company_name = company_name or ""
+            self.entries.append((symbol, exchange_suffix or "", company_name))
+
+            key = symbol.lower()
+            self._symbols[key] = entry_id
+            for i in range(1, min(len(key), MAX_PREFIX) + 1):
+                self._symbol_prefixes[key[:i]].append(entry_id)
+
+            words = _words(company_name)
+            for word in words:
+                for i in range(1, min(len(word), MAX_PREFIX) + 1):
+                    self._word_prefixes[word[:i]].add(entry_id)
+
+            symbol_grams = _trigrams(symbol)
+            name_grams = _trigrams(company_name)
+            for gram in symbol_grams:
+                self._symbol_trigrams[gram].append(entry_id)
+            for gram in name_grams:
+                self._name_trigrams[gram].append(entry_id)
+            self._entry_stats.append((words[0] if words else "", len(words), len(symbol_grams), len(name_grams)))
+
+        # listings were sorted by symbol, so ids already break ties alphabetically
+        for postings in self._symbol_prefixes.values():
+            postings.sort(key=lambda entry_id: len(self.entries[entry_id][0]))
+        for prefix, ids in self._word_prefixes.items():
+            self._ranked_word_prefixes[prefix] = sorted(ids, key=lambda entry_id: self._name_rank(entry_id, prefix))
+
+    # Order of name matches for a query starting with term: names whose first word
+    # starts with it, then fewer words, then shorter symbol (see the score in search)
+    def _name_rank(self, entry_id, term):
+        first_word, word_count, _, _ = self._entry_stats[entry_id]
+        return (not first_word.startswith(term), word_count, len(self.entries[entry_id][0]), entry_id)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        query = query.strip().lower()
+        terms = _words(query)
+        if not terms:
+            return []
+
+        ranked = {}  # {entry id: (tier, -score)}
+
+        # Symbols match the query as typed or with spaces removed ("tata mot").
+        # Within a tier results go shortest symbol first, so the first `limit` new
+        # prefix matches are the only ones that can be returned.
+        for key in dict.fromkeys((query, "".join(terms))):
+            exact = self._symbols.get(key)
+            if exact is not None:
+                ranked[exact] = (EXACT_SYMBOL, 0)
+            found = 0
+            for entry_id in self._symbol_prefixes.get(key[:MAX_PREFIX], ()):
+                if found == limit:
+                    break
+                if entry_id not in ranked and (len(key) <= MAX_PREFIX or self.entries[entry_id][0].lower().startswith(key)):
+                    ranked[entry_id] = (SYMBOL_PREFIX, 0)
+                    found += 1
+
+        # Every query word has to start a word of the company name
+        matches = None
+        for term in terms[1:]:
+            ids = self._word_prefixes.get(term[:MAX_PREFIX], set())
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                break
+        if matches is None or matches:
+            verify = any(len(term) > MAX_PREFIX for term in terms)
+            if verify or (matches is not None and len(matches) <= limit * 4):
+                # Few matches, or a term longer than the stored prefixes: rank them
+                # directly rather than walk the first term's postings
+                pool = self._word_prefixes.get(terms[0][:MAX_PREFIX], set())
+                pool = pool if matches is None else pool & matches
+                candidates = sorted(pool, key=lambda entry_id: self._name_rank(entry_id, terms[0]))
+            else:
+                candidates = self._ranked_word_prefixes.get(terms[0][:MAX_PREFIX], ())
+            found = 0
+            for entry_id in candidates:
+                if found == limit:
+                    break
+                if entry_id in ranked or (matches is not None and entry_id not in matches):
+                    continue
+                if verify:
+                    name_words = _words(self.entries[entry_id][2])
+                    if not all(any(word.startswith(term) for word in name_words) for term in terms):
+                        continue
+                first_word, word_count, _, _ = self._entry_stats[entry_id]
+                # Prefer names that start with the query and have few other words
+                score = (first_word.startswith(terms[0])) + len(terms) / word_count
+                ranked[entry_id] = (NAME_PREFIX, -score)
+                found += 1
+
+        if len(ranked) < limit:
+            grams = _trigrams(query)
+            for postings, info_index in ((self._symbol_trigrams, 2), (self._name_trigrams, 3)):
+                hits = Counter()
+                for gram in grams:
+                    hits.update(postings.get(gram, ()))
+                for entry_id, count in hits.items():
+                    score = count / (len(grams) + self._entry_stats[entry_id][info_index] - count)
+                    if score >= FUZZY_MIN_SCORE and ranked.get(entry_id, (FUZZY, 0)) > (FUZZY, -score):
+                        ranked[entry_id] = (FUZZY, -score)
+
+        best = heapq.nsmallest(limit, ranked, key=lambda entry_id: (ranked[entry_id], len(self.entries[entry_id][0]), self.entries[entry_id][0]))
+        results = []
+        for entry_id in best:
+            symbol, exchange_suffix, company_name = self.entries[entry_id]
+            results.append({
+                "symbol": symbol,
+                "ticker": f"{symbol}{exchange_suffix}",
+                "company_name": company_name or symbol,
+            })
+        return results
+
+_index_cache = TTLCache()
+
+# Function to get the shared search index, built from the symbol master once a day
+def get_search_index():
+    return _index_cache.get_or_fetch(
+        "index",
+        SEARCH_INDEX_TTL,
+        lambda: SymbolSearchIndex(market_data.get_listings())
+    )
+
+# Function to find stocks by symbol or company name, best matches first
+def search_symbols(query, limit=SEARCH_LIMIT):
+    return get_search_index().search(query, limit)
@@ -0,0 +1,41 @@
+import numpy as np
+
+TABLE_PAGE_SIZES = [25, 50, 100, 250]
+
+# Function to store float columns as float32, halving what is sent to the browser.
+# Columns in exclude (e.g. Volume, which float32 cannot hold exactly) are left as they are.
+def to_float32(data, exclude=()):
+    float_columns = [column for column in data.select_dtypes(include="float64").columns if column not in exclude]
+    return data.astype({column: np.float32 for column in float_columns})
+
+# Function to keep the rows whose column lies between min_value and max_value (either may be None)
+def filter_table(data, column=None, min_value=None, max_value=None):
+    if column not in data.columns or (min_value is None and max_value is None):
+        return data
+
+    values = data[column].to_numpy(dtype=np.float64)
+    mask = ~np.isnan(values)
+    if min_value is not None:
+        mask &= values >= min_value
+    if max_value is not None:
+        mask &= values <= max_value
+    return data[mask]
+
+def page_count(row_count, page_size):
+    return max(1, -(-row_count // page_size))
+
+# Function to sort a table and return one page of it. Only the row positions are
+# sorted, so the full frame is never copied. Sorting by anything that is not a
+# column sorts by the index; missing values always go last.
+def table_page(data, sort_by=None, ascending=True, page=1, page_size=TABLE_PAGE_SIZES[0]):
+    if sort_by in data.columns:
+        values = data[sort_by].to_numpy(dtype=np.float64)
+        order = np.argsort(values if ascending else -values, kind="stable")
+    else:
+        order = np.argsort(data.index.to_numpy(), kind="stable")
+        if not ascending:
+            order = order[::-1]
+
+    page = min(max(int(page), 1), page_count(len(data), page_size))
+    start = (page - 1) * page_size
+    return data.iloc[order[start:start + page_size]]